@@ -21,6 +21,9 @@ import app.models.media
 import app.models.section
 import app.models.proposal
 import app.models.invitation
+import app.models.tree_change
+import app.models.ancestry
+import app.models.tree_purge
 
 target_metadata = Base.metadata
 
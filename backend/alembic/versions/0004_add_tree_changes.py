@@ -0,0 +1,47 @@
+"""Add per-tree change log
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tree_changes",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("tree_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "entity_type",
+            sa.Enum("person", "relationship", name="changeentity"),
+            nullable=False,
+        ),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("op", sa.Enum("upsert", "delete", name="changeop"), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["tree_id"], ["trees.id"], ondelete="CASCADE"),
+    )
+    op.create_index("ix_tree_changes_tree_id_version", "tree_changes", ["tree_id", "version"])
+
+
+def downgrade() -> None:
+    op.drop_table("tree_changes")
+    op.execute("DROP TYPE IF EXISTS changeop")
+    op.execute("DROP TYPE IF EXISTS changeentity")
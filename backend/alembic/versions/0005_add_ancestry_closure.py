@@ -0,0 +1,65 @@
+"""Add ancestry closure table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ancestry_closure",
+        sa.Column("ancestor_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("descendant_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("tree_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["persons.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["descendant_id"], ["persons.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["tree_id"], ["trees.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index(
+        "ix_ancestry_closure_descendant_id", "ancestry_closure", ["descendant_id", "ancestor_id"]
+    )
+    op.create_index("ix_ancestry_closure_tree_id", "ancestry_closure", ["tree_id"])
+
+    # Backfill from existing parent edges (stored either as parent rows or as
+    # their child-row inverses). Depth is bounded so cyclic data terminates.
+    op.execute(
+        """
+        WITH RECURSIVE edges AS (
+            SELECT tree_id, person_id AS parent_id, related_person_id AS child_id
+            FROM relationships WHERE relationship_type = 'parent'
+            UNION
+            SELECT tree_id, related_person_id, person_id
+            FROM relationships WHERE relationship_type = 'child'
+        ),
+        walk(tree_id, ancestor_id, descendant_id, depth) AS (
+            SELECT tree_id, parent_id, child_id, 1 FROM edges
+            UNION
+            SELECT walk.tree_id, walk.ancestor_id, edges.child_id, walk.depth + 1
+            FROM walk JOIN edges ON edges.parent_id = walk.descendant_id
+            WHERE walk.depth < 1000
+        )
+        INSERT INTO ancestry_closure (tree_id, ancestor_id, descendant_id, depth)
+        SELECT tree_id, ancestor_id, descendant_id, min(depth)
+        FROM walk
+        WHERE ancestor_id <> descendant_id
+        GROUP BY tree_id, ancestor_id, descendant_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ancestry_closure")
@@ -0,0 +1,42 @@
+"""Add soft tree deletion and purge progress
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("trees", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        "tree_purges",
+        sa.Column("tree_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("owner_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("persons_total", sa.Integer(), nullable=False),
+        sa.Column("persons_deleted", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("files_deleted", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column(
+            "requested_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("tree_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tree_purges")
+    op.drop_column("trees", "deleted_at")
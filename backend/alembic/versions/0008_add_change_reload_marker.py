@@ -0,0 +1,36 @@
+"""Add reload marker to the tree change log
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE changeentity ADD VALUE IF NOT EXISTS 'tree'")
+    op.execute("ALTER TYPE changeop ADD VALUE IF NOT EXISTS 'reload'")
+
+
+def downgrade() -> None:
+    # Postgres cannot drop enum values; rebuild both types without them.
+    op.execute("DELETE FROM tree_changes WHERE op = 'reload' OR entity_type = 'tree'")
+    for name, values in (
+        ("changeentity", "'person', 'relationship'"),
+        ("changeop", "'upsert', 'delete'"),
+    ):
+        column = "entity_type" if name == "changeentity" else "op"
+        op.execute(f"ALTER TYPE {name} RENAME TO {name}_old")
+        op.execute(f"CREATE TYPE {name} AS ENUM ({values})")
+        op.execute(
+            f"ALTER TABLE tree_changes ALTER COLUMN {column} TYPE {name} USING {column}::text::{name}"
+        )
+        op.execute(f"DROP TYPE {name}_old")
@@ -0,0 +1,62 @@
+"""Maintenance commands, run as ``python -m app.cli <command>``."""
+import argparse
+import asyncio
+import uuid
+
+import structlog
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.tree import Tree
+from app.services.ancestry import rebuild_tree_closure
+from app.services.gedcom import import_gedcom
+
+logger = structlog.get_logger()
+
+
+async def rebuild_closure(tree_id: uuid.UUID | None) -> None:
+    async with AsyncSessionLocal() as db:
+        if tree_id is not None:
+            tree_ids = [tree_id]
+        else:
+            tree_ids = (await db.scalars(select(Tree.id).where(Tree.deleted_at.is_(None)))).all()
+
+        for tid in tree_ids:
+            rows = await rebuild_tree_closure(db, tid)
+            await db.commit()
+            logger.info("Ancestry closure rebuilt", tree_id=str(tid), rows=rows)
+
+
+async def import_gedcom_file(tree_id: uuid.UUID, path: str) -> None:
+    async with AsyncSessionLocal() as db:
+        tree = await db.get(Tree, tree_id)
+        if tree is None or tree.deleted_at is not None:
+            raise SystemExit(f"Tree {tree_id} not found")
+        with open(path, "rb") as stream:
+            result = await import_gedcom(db, tree_id, stream)
+        await db.commit()
+        print(f"Imported {result.persons} persons and {result.relationships} relationships")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-closure", help="Recompute the ancestry closure table from relationships"
+    )
+    rebuild.add_argument("--tree", type=uuid.UUID, help="Only rebuild this tree")
+
+    gedcom = commands.add_parser("import-gedcom", help="Import a GEDCOM 5.5.1 file into a tree")
+    gedcom.add_argument("path", help="Path to the .ged file")
+    gedcom.add_argument("--tree", type=uuid.UUID, required=True, help="Target tree id")
+
+    args = parser.parse_args(argv)
+    if args.command == "rebuild-closure":
+        asyncio.run(rebuild_closure(args.tree))
+    elif args.command == "import-gedcom":
+        asyncio.run(import_gedcom_file(args.tree, args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,13 @@ class Settings(BaseSettings):
     STORAGE_BUCKET: str = "roots"
     STORAGE_USE_SSL: bool = False
 
+    LAYOUT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    GRAPH_INDEX_MAX_BYTES: int = 128 * 1024 * 1024
+    LAYOUT_WORKERS: int = 2
+    LAYOUT_TIMEOUT_SECONDS: float = 10.0
+    LAYOUT_BACKOFF_SECONDS: float = 300.0
+    LAYOUT_INLINE_MAX_NODES: int = 5000
+
     FRONTEND_URL: str = "http://localhost:3000"
     ENVIRONMENT: str = "development"
 
@@ -1,9 +1,16 @@
-from collections.abc import AsyncGenerator
+import uuid
+from collections.abc import AsyncGenerator, Callable, Iterable
 
+import structlog
+from sqlalchemy import all_, any_, event, literal
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 
 from app.config import settings
 
+logger = structlog.get_logger()
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.ENVIRONMENT == "development",
@@ -31,3 +38,31 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+def any_uuid(ids: Iterable[uuid.UUID]):
+    """``= ANY(:ids)`` operand binding the whole id list as a single array parameter."""
+    return any_(literal(list(ids), ARRAY(UUID(as_uuid=True))))
+
+
+def all_uuid(ids: Iterable[uuid.UUID]):
+    return all_(literal(list(ids), ARRAY(UUID(as_uuid=True))))
+
+
+def run_after_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the session's current transaction commits; drop it on rollback."""
+    db.sync_session.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception:
+            logger.error("After-commit callback failed", exc_info=True)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_commit_callbacks(session: Session, previous_transaction) -> None:
+    session.info.pop("after_commit", None)
@@ -1,3 +1,4 @@
+import uuid
 from collections.abc import Callable
 from typing import Annotated
 
@@ -6,6 +7,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.models.person import Person
+from app.models.tree import Tree
 from app.models.user import User, UserRole
 from app.services.auth import decode_token
 
@@ -61,3 +64,37 @@ def require_role(*roles: UserRole) -> Callable:
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
+async def get_tree_with_access(tree_id: uuid.UUID, current_user: User, db: AsyncSession) -> Tree:
+    """Load a tree the user may edit (its owner, or an admin/editor)."""
+    result = await db.execute(select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None)))
+    tree = result.scalar_one_or_none()
+    if not tree:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
+    if tree.owner_id != current_user.id and current_user.role not in (UserRole.admin, UserRole.editor):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return tree
+
+
+async def get_person_with_access(
+    person_id: uuid.UUID, current_user: User, db: AsyncSession, *options
+) -> Person:
+    """Load a person and check the user may edit their tree, in one query.
+
+    ``options`` are loader options (e.g. ``selectinload``) applied to the person.
+    """
+    result = await db.execute(
+        select(Person, Tree.owner_id)
+        .join(Tree, Tree.id == Person.tree_id)
+        .where(Person.id == person_id, Tree.deleted_at.is_(None))
+        .options(*options)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found")
+
+    person, owner_id = row
+    if owner_id != current_user.id and current_user.role not in (UserRole.admin, UserRole.editor):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return person
@@ -10,6 +10,7 @@ from app.config import settings
 from app.routers import (
     admin,
     auth,
+    duplicates,
     invitations,
     media,
     persons,
@@ -19,7 +20,9 @@ from app.routers import (
     sections,
     trees,
 )
+from app.services.layout_pool import layout_pool
 from app.services.storage import init_storage
+from app.services.tree_purge import tree_purger
 
 structlog.configure(
     processors=[
@@ -40,7 +43,10 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI):
     logger.info("Starting up roots backend")
     await init_storage()
+    await tree_purger.resume()
     yield
+    await tree_purger.shutdown()
+    layout_pool.shutdown()
     logger.info("Shutting down roots backend")
 
 
@@ -85,6 +91,7 @@ app.include_router(sections.router, prefix="", tags=["sections"])
 app.include_router(proposals.router, prefix="", tags=["proposals"])
 app.include_router(invitations.router, prefix="", tags=["invitations"])
 app.include_router(search.router, prefix="", tags=["search"])
+app.include_router(duplicates.router, prefix="", tags=["duplicates"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 
@@ -7,6 +7,9 @@ from app.models.media import PersonPhoto, PersonDocument
 from app.models.section import PersonSection
 from app.models.proposal import EditProposal, ProposalStatus
 from app.models.invitation import Invitation
+from app.models.tree_change import ChangeEntity, ChangeOp, TreeChange
+from app.models.ancestry import AncestryClosure
+from app.models.tree_purge import TreePurge
 
 __all__ = [
     "Base",
@@ -23,4 +26,9 @@ __all__ = [
     "EditProposal",
     "ProposalStatus",
     "Invitation",
+    "TreeChange",
+    "ChangeEntity",
+    "ChangeOp",
+    "AncestryClosure",
+    "TreePurge",
 ]
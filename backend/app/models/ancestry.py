@@ -0,0 +1,32 @@
+import uuid
+
+from sqlalchemy import ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class AncestryClosure(Base):
+    """Transitive closure of parent edges: one row per (ancestor, descendant) pair.
+
+    ``depth`` is the shortest number of generations between the two. Persons
+    are not stored as their own ancestors.
+    """
+
+    __tablename__ = "ancestry_closure"
+    __table_args__ = (
+        Index("ix_ancestry_closure_descendant_id", "descendant_id", "ancestor_id"),
+        Index("ix_ancestry_closure_tree_id", "tree_id"),
+    )
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("persons.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("persons.id", ondelete="CASCADE"), primary_key=True
+    )
+    tree_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("trees.id", ondelete="CASCADE"), nullable=False
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, Enum, ForeignKey, String, text
+from sqlalchemy import BigInteger, Date, DateTime, Enum, ForeignKey, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -44,32 +44,41 @@ class Person(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=text("now()"), onupdate=datetime.utcnow
     )
+    # Row version for optimistic concurrency (served as the ETag); bumped by every UPDATE.
+    version: Mapped[int] = mapped_column(
+        BigInteger, server_default=text("0"), onupdate=text("version + 1")
+    )
 
     tree: Mapped["Tree"] = relationship("Tree", back_populates="persons")
     linked_user: Mapped["User | None"] = relationship(
         "User", foreign_keys="User.person_id", back_populates="person"
     )
     photos: Mapped[list["PersonPhoto"]] = relationship(
-        "PersonPhoto", back_populates="person", cascade="all, delete-orphan"
+        "PersonPhoto", back_populates="person", cascade="all, delete-orphan", passive_deletes=True
     )
     documents: Mapped[list["PersonDocument"]] = relationship(
-        "PersonDocument", back_populates="person", cascade="all, delete-orphan"
+        "PersonDocument", back_populates="person", cascade="all, delete-orphan", passive_deletes=True
     )
     sections: Mapped[list["PersonSection"]] = relationship(
-        "PersonSection", back_populates="person", cascade="all, delete-orphan"
+        "PersonSection", back_populates="person", cascade="all, delete-orphan", passive_deletes=True
     )
     proposals: Mapped[list["EditProposal"]] = relationship(
-        "EditProposal", back_populates="target_person", cascade="all, delete-orphan"
+        "EditProposal",
+        back_populates="target_person",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     relationships_as_person: Mapped[list["Relationship"]] = relationship(
         "Relationship",
         foreign_keys="Relationship.person_id",
         back_populates="person",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     relationships_as_related: Mapped[list["Relationship"]] = relationship(
         "Relationship",
         foreign_keys="Relationship.related_person_id",
         back_populates="related_person",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
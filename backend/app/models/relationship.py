@@ -15,6 +15,14 @@ class RelationshipType(str, enum.Enum):
     sibling = "sibling"
 
 
+INVERSE_RELATIONSHIP: dict[RelationshipType, RelationshipType] = {
+    RelationshipType.parent: RelationshipType.child,
+    RelationshipType.child: RelationshipType.parent,
+    RelationshipType.spouse: RelationshipType.spouse,
+    RelationshipType.sibling: RelationshipType.sibling,
+}
+
+
 class Relationship(Base):
     __tablename__ = "relationships"
     __table_args__ = (
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, text
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,11 +21,14 @@ class Tree(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=text("now()")
     )
+    version: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text("0"))
+    # Set when deletion is requested; the rows are purged in the background.
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     owner: Mapped["User"] = relationship("User", back_populates="owned_trees")
     persons: Mapped[list["Person"]] = relationship(
-        "Person", back_populates="tree", cascade="all, delete-orphan"
+        "Person", back_populates="tree", cascade="all, delete-orphan", passive_deletes=True
     )
     relationships: Mapped[list["Relationship"]] = relationship(
-        "Relationship", back_populates="tree", cascade="all, delete-orphan"
+        "Relationship", back_populates="tree", cascade="all, delete-orphan", passive_deletes=True
     )
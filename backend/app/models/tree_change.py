@@ -0,0 +1,41 @@
+import enum
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Enum, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ChangeEntity(str, enum.Enum):
+    person = "person"
+    relationship = "relationship"
+    tree = "tree"
+
+
+class ChangeOp(str, enum.Enum):
+    upsert = "upsert"
+    delete = "delete"
+    # Whole-tree rewrite at this version: clients behind it must reload in full.
+    reload = "reload"
+
+
+class TreeChange(Base):
+    __tablename__ = "tree_changes"
+    __table_args__ = (Index("ix_tree_changes_tree_id_version", "tree_id", "version"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    tree_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("trees.id", ondelete="CASCADE"), nullable=False
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    entity_type: Mapped[ChangeEntity] = mapped_column(
+        Enum(ChangeEntity, name="changeentity"), nullable=False
+    )
+    entity_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    op: Mapped[ChangeOp] = mapped_column(Enum(ChangeOp, name="changeop"), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
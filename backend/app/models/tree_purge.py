@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class TreePurge(Base):
+    """Progress of a background tree deletion; outlives the tree row it tracks."""
+
+    __tablename__ = "tree_purges"
+
+    tree_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    owner_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    persons_total: Mapped[int] = mapped_column(Integer, nullable=False)
+    persons_deleted: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    files_deleted: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    requested_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,83 @@
+import uuid
+
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import any_uuid, get_db
+from app.deps import CurrentUser, get_tree_with_access, require_role
+from app.models.person import Person
+from app.models.user import UserRole
+from app.schemas.person import DuplicatePair, PersonMerge, PersonOut
+from app.services.duplicates import MergeConflict, find_duplicates, merge_persons
+from app.services.tree_changes import record_changes
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+
+@router.get("/trees/{tree_id}/duplicates", response_model=list[DuplicatePair])
+async def list_duplicates(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    min_score: float = Query(0.75, ge=0.0, le=1.0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    await get_tree_with_access(tree_id, current_user, db)
+    pairs = await find_duplicates(db, tree_id, min_score, limit)
+
+    ids = {pid for a, b, _ in pairs for pid in (a, b)}
+    result = await db.execute(select(Person).where(Person.id == any_uuid(ids)))
+    persons = {person.id: person for person in result.scalars()}
+    return [
+        DuplicatePair(person=persons[a], other=persons[b], score=value)
+        for a, b, value in pairs
+    ]
+
+
+@router.post("/trees/{tree_id}/duplicates/merge", response_model=PersonOut)
+async def merge_duplicates(
+    tree_id: uuid.UUID,
+    payload: PersonMerge,
+    current_user=Depends(require_role(UserRole.admin, UserRole.editor)),
+    db: AsyncSession = Depends(get_db),
+):
+    await get_tree_with_access(tree_id, current_user, db)
+    if payload.survivor_id == payload.duplicate_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot merge a person into itself")
+
+    result = await db.execute(
+        select(Person).where(
+            Person.id == any_uuid([payload.survivor_id, payload.duplicate_id]),
+            Person.tree_id == tree_id,
+        )
+    )
+    persons = {person.id: person for person in result.scalars()}
+    if len(persons) != 2:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found")
+    survivor, duplicate = persons[payload.survivor_id], persons[payload.duplicate_id]
+
+    try:
+        repointed, removed = await merge_persons(db, survivor, duplicate)
+    except MergeConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    await db.refresh(survivor)
+    await record_changes(
+        db,
+        tree_id,
+        persons=[survivor.id],
+        relationships=repointed,
+        removed_persons=[payload.duplicate_id],
+        removed_relationships=removed,
+    )
+    logger.info(
+        "Persons merged",
+        tree_id=str(tree_id),
+        survivor_id=str(payload.survivor_id),
+        duplicate_id=str(payload.duplicate_id),
+        relationships=len(repointed),
+    )
+    return survivor
@@ -7,13 +7,11 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.deps import CurrentUser, get_current_user
+from app.deps import CurrentUser, get_current_user, get_person_with_access
 from app.models.media import PersonDocument, PersonPhoto
-from app.models.person import Person
-from app.models.tree import Tree
-from app.models.user import UserRole
 from app.schemas.media import DocumentOut, PhotoOut, PhotoUpdate
 from app.services.storage import delete_file, upload_file, upload_image_with_thumb
+from app.services.tree_changes import record_changes
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -30,25 +28,6 @@ MAX_PHOTO_SIZE = 5 * 1024 * 1024
 MAX_DOC_SIZE = 20 * 1024 * 1024
 
 
-async def _get_person_with_access(
-    person_id: uuid.UUID, current_user, db: AsyncSession
-) -> Person:
-    result = await db.execute(select(Person).where(Person.id == person_id))
-    person = result.scalar_one_or_none()
-    if not person:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found")
-
-    tree_result = await db.execute(select(Tree).where(Tree.id == person.tree_id))
-    tree = tree_result.scalar_one_or_none()
-    if not tree:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
-
-    if tree.owner_id != current_user.id and current_user.role not in (UserRole.admin, UserRole.editor):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-
-    return person
-
-
 @router.post("/persons/{person_id}/photos", response_model=PhotoOut, status_code=status.HTTP_201_CREATED)
 async def upload_photo(
     person_id: uuid.UUID,
@@ -56,7 +35,7 @@ async def upload_photo(
     current_user: CurrentUser = None,
     db: AsyncSession = Depends(get_db),
 ):
-    person = await _get_person_with_access(person_id, current_user, db)
+    person = await get_person_with_access(person_id, current_user, db)
 
     content_type = file.content_type or ""
     if content_type not in ALLOWED_IMAGE_MIME:
@@ -82,6 +61,7 @@ async def upload_photo(
     db.add(photo)
     await db.flush()
     await db.refresh(photo)
+    await record_changes(db, person.tree_id, persons=[person.id])
     logger.info("Photo uploaded", photo_id=str(photo.id), person_id=str(person_id))
     return photo
 
@@ -92,7 +72,7 @@ async def list_photos(
     current_user: CurrentUser = None,
     db: AsyncSession = Depends(get_db),
 ):
-    await _get_person_with_access(person_id, current_user, db)
+    await get_person_with_access(person_id, current_user, db)
     result = await db.execute(
         select(PersonPhoto)
         .where(PersonPhoto.person_id == person_id)
@@ -113,7 +93,7 @@ async def update_photo(
     if not photo:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found")
 
-    await _get_person_with_access(photo.person_id, current_user, db)
+    person = await get_person_with_access(photo.person_id, current_user, db)
 
     if payload.caption is not None:
         photo.caption = payload.caption
@@ -122,6 +102,7 @@ async def update_photo(
 
     await db.flush()
     await db.refresh(photo)
+    await record_changes(db, person.tree_id, persons=[person.id])
     return photo
 
 
@@ -136,9 +117,10 @@ async def delete_photo(
     if not photo:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found")
 
-    await _get_person_with_access(photo.person_id, current_user, db)
+    person = await get_person_with_access(photo.person_id, current_user, db)
     await delete_file(photo.file_url)
     await db.delete(photo)
+    await record_changes(db, person.tree_id, persons=[person.id])
     logger.info("Photo deleted", photo_id=str(photo_id))
 
 
@@ -149,7 +131,7 @@ async def upload_document(
     current_user: CurrentUser = None,
     db: AsyncSession = Depends(get_db),
 ):
-    person = await _get_person_with_access(person_id, current_user, db)
+    person = await get_person_with_access(person_id, current_user, db)
 
     content_type = file.content_type or ""
     file_bytes = await file.read()
@@ -178,6 +160,7 @@ async def upload_document(
     db.add(doc)
     await db.flush()
     await db.refresh(doc)
+    await record_changes(db, person.tree_id, persons=[person.id])
     logger.info("Document uploaded", doc_id=str(doc.id), person_id=str(person_id))
     return doc
 
@@ -188,7 +171,7 @@ async def list_documents(
     current_user: CurrentUser = None,
     db: AsyncSession = Depends(get_db),
 ):
-    await _get_person_with_access(person_id, current_user, db)
+    await get_person_with_access(person_id, current_user, db)
     result = await db.execute(
         select(PersonDocument)
         .where(PersonDocument.person_id == person_id)
@@ -208,7 +191,8 @@ async def delete_document(
     if not doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
 
-    await _get_person_with_access(doc.person_id, current_user, db)
+    person = await get_person_with_access(doc.person_id, current_user, db)
     await delete_file(doc.file_url)
     await db.delete(doc)
+    await record_changes(db, person.tree_id, persons=[person.id])
     logger.info("Document deleted", doc_id=str(doc_id))
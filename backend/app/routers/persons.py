@@ -1,23 +1,43 @@
 import uuid
 from datetime import datetime
+from typing import Annotated
 
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import and_, case, delete, func, literal, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
 
-from app.database import get_db
-from app.deps import CurrentUser, get_current_user, require_role
+from app.database import any_uuid, get_db
+from app.deps import CurrentUser, get_current_user, get_person_with_access, require_role
+from app.models.media import PersonDocument, PersonPhoto
 from app.models.person import Person
-from app.models.relationship import Relationship
+from app.models.relationship import INVERSE_RELATIONSHIP, Relationship, RelationshipType
 from app.models.tree import Tree
 from app.models.user import UserRole
-from app.schemas.person import PersonCreate, PersonOut, PersonUpdate
-from app.schemas.relationship import RelationshipWithPersonOut
+from app.schemas.person import (
+    LineageEntry,
+    LineagePage,
+    PersonBatchGet,
+    PersonBulkCreate,
+    PersonBulkCreated,
+    PersonCreate,
+    PersonOut,
+    PersonProfile,
+    PersonUpdate,
+)
+from app.schemas.relationship import PersonInRelationship, RelationshipWithPersonOut
+from app.services.ancestry import parent_edge, remove_person_edges
+from app.services.bulk import insert_persons
+from app.services.storage import remove_files_after_commit
+from app.services.tree_changes import record_changes
 
 router = APIRouter()
 logger = structlog.get_logger()
 
+MAX_LINEAGE_DEPTH = 100
+
 
 async def _get_person_or_404(person_id: uuid.UUID, db: AsyncSession) -> Person:
     result = await db.execute(select(Person).where(Person.id == person_id))
@@ -28,7 +48,7 @@ async def _get_person_or_404(person_id: uuid.UUID, db: AsyncSession) -> Person:
 
 
 async def _verify_tree_access(tree_id: uuid.UUID, current_user, db: AsyncSession) -> Tree:
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
+    result = await db.execute(select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None)))
     tree = result.scalar_one_or_none()
     if not tree:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
@@ -37,17 +57,59 @@ async def _verify_tree_access(tree_id: uuid.UUID, current_user, db: AsyncSession
     return tree
 
 
+def _person_etag(person_id: uuid.UUID, version: int) -> str:
+    return f'"{person_id}-{version}"'
+
+
+def _if_match_versions(if_match: str, person_id: uuid.UUID) -> list[int] | None:
+    """Versions named by an ``If-Match`` header; ``None`` for ``*`` (any version)."""
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag == "*":
+            return None
+        tagged_id, _, version = tag.strip('"').rpartition("-")
+        if tagged_id == str(person_id) and version.isdigit():
+            versions.append(int(version))
+    return versions
+
+
 @router.get("/persons/{person_id}", response_model=PersonOut)
 async def get_person(
     person_id: uuid.UUID,
+    response: Response,
     current_user: CurrentUser,
     db: AsyncSession = Depends(get_db),
 ):
     person = await _get_person_or_404(person_id, db)
     await _verify_tree_access(person.tree_id, current_user, db)
+    response.headers["ETag"] = _person_etag(person.id, person.version)
     return person
 
 
+@router.post("/persons:batch-get", response_model=list[PersonOut])
+async def batch_get_persons(
+    payload: PersonBatchGet,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+):
+    """Persons for the requested ids, in request order; unknown ids are left out."""
+    result = await db.execute(
+        select(Person, Tree.owner_id)
+        .join(Tree, Tree.id == Person.tree_id)
+        .where(Person.id == any_uuid(set(payload.ids)), Tree.deleted_at.is_(None))
+    )
+    rows = result.all()
+
+    if current_user.role not in (UserRole.admin, UserRole.editor):
+        owners = {person.tree_id: owner_id for person, owner_id in rows}
+        if any(owner_id != current_user.id for owner_id in owners.values()):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    by_id = {person.id: person for person, _ in rows}
+    return [by_id[pid] for pid in dict.fromkeys(payload.ids) if pid in by_id]
+
+
 @router.post("/trees/{tree_id}/persons", response_model=PersonOut, status_code=status.HTTP_201_CREATED)
 async def create_person(
     tree_id: uuid.UUID,
@@ -72,25 +134,52 @@ async def create_person(
     db.add(person)
     await db.flush()
     await db.refresh(person)
+    await record_changes(db, tree_id, persons=[person.id])
     logger.info("Person created", person_id=str(person.id), tree_id=str(tree_id))
     return person
 
 
+@router.post(
+    "/trees/{tree_id}/persons:bulk",
+    response_model=PersonBulkCreated,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_persons_bulk(
+    tree_id: uuid.UUID,
+    payload: PersonBulkCreate,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+):
+    await _verify_tree_access(tree_id, current_user, db)
+
+    ids = await insert_persons(db, tree_id, [p.model_dump() for p in payload.persons])
+    await record_changes(db, tree_id, persons=ids)
+    logger.info("Persons bulk created", tree_id=str(tree_id), count=len(ids))
+    return PersonBulkCreated(ids=ids)
+
+
 @router.put("/persons/{person_id}", response_model=PersonOut)
 async def update_person(
     person_id: uuid.UUID,
     payload: PersonUpdate,
+    response: Response,
     current_user: CurrentUser,
+    if_match: Annotated[str | None, Header()] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    person = await _get_person_or_404(person_id, db)
-    tree = await _verify_tree_access(person.tree_id, current_user, db)
+    """Apply the changes in one ``UPDATE ... RETURNING``.
+
+    With ``If-Match`` the update only applies to the version the client last
+    read; a concurrent save in between answers 412 instead of being
+    overwritten.
+    """
+    update_data = payload.model_dump(exclude_none=True)
 
     if current_user.role == UserRole.user:
         from app.models.proposal import EditProposal, ProposalStatus
 
+        person = await get_person_with_access(person_id, current_user, db)
         field_changes = {}
-        update_data = payload.model_dump(exclude_none=True)
         for field, new_value in update_data.items():
             old_value = getattr(person, field, None)
             if old_value != new_value:
@@ -111,16 +200,36 @@ async def update_person(
                 status_code=status.HTTP_202_ACCEPTED,
                 detail="Edit proposal submitted for review",
             )
+        response.headers["ETag"] = _person_etag(person.id, person.version)
         return person
 
-    update_data = payload.model_dump(exclude_none=True)
-    for field, value in update_data.items():
-        setattr(person, field, value)
-    person.updated_at = datetime.utcnow()
+    writable_trees = select(Tree.id).where(Tree.deleted_at.is_(None))
+    if current_user.role not in (UserRole.admin, UserRole.editor):
+        writable_trees = writable_trees.where(Tree.owner_id == current_user.id)
+    stmt = (
+        update(Person)
+        .where(Person.id == person_id, Person.tree_id.in_(writable_trees))
+        .values(**update_data, updated_at=datetime.utcnow(), version=Person.version + 1)
+        .returning(Person)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    if if_match is not None:
+        versions = _if_match_versions(if_match, person_id)
+        if versions is not None:
+            stmt = stmt.where(Person.version.in_(versions))
 
-    await db.flush()
-    await db.refresh(person)
-    logger.info("Person updated", person_id=str(person_id))
+    person = (await db.scalars(stmt)).one_or_none()
+    if person is None:
+        # Nothing matched: tell a missing person and a forbidden tree from a stale version.
+        await get_person_with_access(person_id, current_user, db)
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Person was modified by someone else",
+        )
+
+    await record_changes(db, person.tree_id, persons=[person_id])
+    response.headers["ETag"] = _person_etag(person.id, person.version)
+    logger.info("Person updated", person_id=str(person_id), version=person.version)
     return person
 
 
@@ -131,19 +240,106 @@ async def delete_person(
     db: AsyncSession = Depends(get_db),
 ):
     person = await _get_person_or_404(person_id, db)
+    tree_id = person.tree_id
 
-    rels_result = await db.execute(
-        select(Relationship).where(
-            (Relationship.person_id == person_id) | (Relationship.related_person_id == person_id)
+    removed = await db.execute(
+        delete(Relationship)
+        .where((Relationship.person_id == person_id) | (Relationship.related_person_id == person_id))
+        .returning(
+            Relationship.id,
+            Relationship.person_id,
+            Relationship.related_person_id,
+            Relationship.relationship_type,
         )
+        .execution_options(synchronize_session=False)
     )
-    for rel in rels_result.scalars().all():
-        await db.delete(rel)
+    relationships = removed.all()
+    # Paths running through this person disappear with it.
+    if any(parent_edge(r.relationship_type, r.person_id, r.related_person_id) for r in relationships):
+        await remove_person_edges(db, tree_id, person_id)
 
-    await db.delete(person)
+    files = await db.scalars(
+        union_all(
+            select(PersonPhoto.file_url).where(PersonPhoto.person_id == person_id),
+            select(PersonDocument.file_url).where(PersonDocument.person_id == person_id),
+        )
+    )
+    file_urls = [*files, person.avatar_url, person.avatar_thumb_url]
+
+    # Photos, documents, sections, proposals and closure rows go with the
+    # person through their ON DELETE CASCADE foreign keys.
+    await db.execute(
+        delete(Person).where(Person.id == person_id).execution_options(synchronize_session=False)
+    )
+    db.expunge(person)
+    await record_changes(
+        db,
+        tree_id,
+        removed_persons=[person_id],
+        removed_relationships=relationships,
+    )
+    remove_files_after_commit(db, file_urls)
     logger.info("Person deleted", person_id=str(person_id))
 
 
+async def _relationships_with_persons(
+    db: AsyncSession, person_id: uuid.UUID
+) -> list[RelationshipWithPersonOut]:
+    # Incoming rows are listed only when the person has no matching outgoing
+    # inverse row, so pairs stored in both directions appear once. They are
+    # turned around (ids swapped, type inverted) so every item reads
+    # "person -> related" from the requested person's side.
+    inverse = aliased(Relationship)
+    inverse_type = case(
+        {
+            kind: literal(inverse_kind, Relationship.relationship_type.type)
+            for kind, inverse_kind in INVERSE_RELATIONSHIP.items()
+        },
+        value=Relationship.relationship_type,
+        else_=Relationship.relationship_type,
+    )
+    has_inverse = (
+        select(inverse.id)
+        .where(
+            inverse.person_id == person_id,
+            inverse.related_person_id == Relationship.person_id,
+            inverse.relationship_type == inverse_type,
+        )
+        .exists()
+    )
+    outgoing = Relationship.person_id == person_id
+    other = aliased(Person)
+    other_id = case((outgoing, Relationship.related_person_id), else_=Relationship.person_id)
+    rows = await db.execute(
+        select(
+            Relationship.id,
+            Relationship.tree_id,
+            literal(person_id, PG_UUID(as_uuid=True)).label("person_id"),
+            other_id.label("related_person_id"),
+            case((outgoing, Relationship.relationship_type), else_=inverse_type).label(
+                "relationship_type"
+            ),
+            other,
+        )
+        .outerjoin(other, other.id == other_id)
+        .where(
+            or_(
+                outgoing,
+                and_(Relationship.related_person_id == person_id, ~has_inverse),
+            )
+        )
+    )
+
+    result = []
+    for row in rows:
+        item = RelationshipWithPersonOut.model_validate(row)
+        related_person = row[-1]
+        if related_person:
+            item.related = PersonInRelationship.model_validate(related_person)
+        result.append(item)
+    return result
+
+
 @router.get("/persons/{person_id}/relationships", response_model=list[RelationshipWithPersonOut])
 async def get_person_relationships(
     person_id: uuid.UUID,
@@ -153,19 +349,137 @@ async def get_person_relationships(
     person = await _get_person_or_404(person_id, db)
     await _verify_tree_access(person.tree_id, current_user, db)
 
-    rels_result = await db.execute(
-        select(Relationship).where(Relationship.person_id == person_id)
+    return await _relationships_with_persons(db, person_id)
+
+
+@router.get("/persons/{person_id}/profile", response_model=PersonProfile)
+async def get_person_profile(
+    person_id: uuid.UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+):
+    person = await get_person_with_access(
+        person_id,
+        current_user,
+        db,
+        selectinload(Person.photos),
+        selectinload(Person.documents),
+        selectinload(Person.sections),
     )
-    relationships = rels_result.scalars().all()
+    profile = PersonProfile.model_validate(person)
+    profile.photos.sort(key=lambda photo: (photo.sort_order, photo.uploaded_at))
+    profile.documents.sort(key=lambda document: document.uploaded_at, reverse=True)
+    profile.sections.sort(key=lambda section: section.sort_order)
+    profile.relationships = await _relationships_with_persons(db, person_id)
+    return profile
 
-    result = []
-    for rel in relationships:
-        related_result = await db.execute(select(Person).where(Person.id == rel.related_person_id))
-        related_person = related_result.scalar_one_or_none()
-        item = RelationshipWithPersonOut.model_validate(rel)
-        if related_person:
-            from app.schemas.relationship import PersonInRelationship
-            item.related = PersonInRelationship.model_validate(related_person)
-        result.append(item)
 
-    return result
+def _parse_lineage_cursor(cursor: str) -> tuple[int, uuid.UUID]:
+    try:
+        generation, person_id = cursor.split(":", 1)
+        return int(generation), uuid.UUID(person_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def _lineage_page(
+    db: AsyncSession,
+    person: Person,
+    *,
+    upward: bool,
+    max_depth: int,
+    limit: int,
+    cursor: str | None,
+) -> LineagePage:
+    """One page of a person's ancestors (``upward``) or descendants.
+
+    A single recursive CTE walks ``parent`` rows up to ``max_depth``
+    generations. The recursive part uses UNION, so a (person, depth) pair is
+    expanded at most once: pedigree collapse does not multiply rows and a
+    cycle in bad data stops at the depth limit. Each person is reported at
+    their nearest generation, ordered by (generation, id) for keyset paging.
+    """
+    focal = literal(person.id, PG_UUID(as_uuid=True))
+    if upward:
+        step_from, step_to = Relationship.related_person_id, Relationship.person_id
+    else:
+        step_from, step_to = Relationship.person_id, Relationship.related_person_id
+
+    lineage = select(focal.label("person_id"), literal(0).label("depth")).cte(
+        "lineage", recursive=True
+    )
+    lineage = lineage.union(
+        select(step_to, lineage.c.depth + 1)
+        .join(lineage, step_from == lineage.c.person_id)
+        .where(
+            Relationship.tree_id == person.tree_id,
+            Relationship.relationship_type == RelationshipType.parent,
+            lineage.c.depth < max_depth,
+            step_to != focal,
+        )
+    )
+    distance = (
+        select(lineage.c.person_id, func.min(lineage.c.depth).label("generation"))
+        .group_by(lineage.c.person_id)
+        .subquery()
+    )
+
+    query = (
+        select(Person, distance.c.generation)
+        .join(distance, Person.id == distance.c.person_id)
+        .where(distance.c.generation > 0)
+    )
+    if cursor is not None:
+        after_generation, after_id = _parse_lineage_cursor(cursor)
+        query = query.where(
+            (distance.c.generation > after_generation)
+            | ((distance.c.generation == after_generation) & (Person.id > after_id))
+        )
+    query = query.order_by(distance.c.generation, Person.id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_person, last_generation = rows[-1]
+        next_cursor = f"{last_generation}:{last_person.id}"
+
+    return LineagePage(
+        items=[
+            LineageEntry(generation=generation, person=PersonOut.model_validate(p))
+            for p, generation in rows
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/persons/{person_id}/ancestors", response_model=LineagePage)
+async def get_person_ancestors(
+    person_id: uuid.UUID,
+    current_user: CurrentUser,
+    max_depth: int = Query(10, ge=1, le=MAX_LINEAGE_DEPTH),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    person = await _get_person_or_404(person_id, db)
+    await _verify_tree_access(person.tree_id, current_user, db)
+    return await _lineage_page(
+        db, person, upward=True, max_depth=max_depth, limit=limit, cursor=cursor
+    )
+
+
+@router.get("/persons/{person_id}/descendants", response_model=LineagePage)
+async def get_person_descendants(
+    person_id: uuid.UUID,
+    current_user: CurrentUser,
+    max_depth: int = Query(10, ge=1, le=MAX_LINEAGE_DEPTH),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    person = await _get_person_or_404(person_id, db)
+    await _verify_tree_access(person.tree_id, current_user, db)
+    return await _lineage_page(
+        db, person, upward=False, max_depth=max_depth, limit=limit, cursor=cursor
+    )
@@ -12,6 +12,7 @@ from app.models.person import Person
 from app.models.proposal import EditProposal, ProposalStatus
 from app.models.user import UserRole
 from app.schemas.proposal import ProposalCreate, ProposalOut, ProposalReview
+from app.services.tree_changes import record_changes
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -104,6 +105,7 @@ async def review_proposal(
                     new_value = change.get("after")
                     setattr(person, field, new_value)
             person.updated_at = datetime.now(timezone.utc)
+            await record_changes(db, person.tree_id, persons=[person.id])
 
     await db.flush()
     await db.refresh(proposal)
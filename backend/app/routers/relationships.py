@@ -3,29 +3,37 @@ import uuid
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import any_uuid, get_db
 from app.deps import CurrentUser, get_current_user
 from app.models.person import Person
-from app.models.relationship import Relationship, RelationshipType
+from app.models.relationship import INVERSE_RELATIONSHIP, Relationship, RelationshipType
 from app.models.tree import Tree
 from app.models.user import UserRole
-from app.schemas.relationship import RelationshipCreate, RelationshipOut
+from app.schemas.relationship import RelationshipBulkCreate, RelationshipCreate, RelationshipOut
+from app.services.ancestry import (
+    add_parent_edge,
+    add_parent_edges,
+    closes_cycle,
+    is_ancestor,
+    parent_edge,
+    remove_parent_edge,
+)
+from app.services.tree_changes import record_changes
 
 router = APIRouter()
 logger = structlog.get_logger()
 
-INVERSE_RELATIONSHIP: dict[RelationshipType, RelationshipType] = {
-    RelationshipType.parent: RelationshipType.child,
-    RelationshipType.child: RelationshipType.parent,
-    RelationshipType.spouse: RelationshipType.spouse,
-    RelationshipType.sibling: RelationshipType.sibling,
-}
+def _cycle_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT, detail="Relationship would create an ancestry cycle"
+    )
 
 
 async def _verify_tree_ownership(tree_id: uuid.UUID, current_user, db: AsyncSession) -> Tree:
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
+    result = await db.execute(select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None)))
     tree = result.scalar_one_or_none()
     if not tree:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
@@ -70,6 +78,12 @@ async def create_relationship(
             status_code=status.HTTP_409_CONFLICT, detail="Relationship already exists"
         )
 
+    edge = parent_edge(payload.relationship_type, payload.person_id, payload.related_person_id)
+    if edge and (edge[0] == edge[1] or await is_ancestor(db, edge[1], edge[0])):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Relationship would create an ancestry cycle"
+        )
+
     rel = Relationship(
         tree_id=payload.tree_id,
         person_id=payload.person_id,
@@ -77,6 +91,7 @@ async def create_relationship(
         relationship_type=payload.relationship_type,
     )
     db.add(rel)
+    created = [rel]
 
     inverse_type = INVERSE_RELATIONSHIP.get(payload.relationship_type)
     if inverse_type:
@@ -95,9 +110,13 @@ async def create_relationship(
                 relationship_type=inverse_type,
             )
             db.add(inverse_rel)
+            created.append(inverse_rel)
 
     await db.flush()
     await db.refresh(rel)
+    if edge:
+        await add_parent_edge(db, payload.tree_id, *edge)
+    await record_changes(db, payload.tree_id, relationships=created)
     logger.info(
         "Relationship created",
         rel_id=str(rel.id),
@@ -108,6 +127,87 @@ async def create_relationship(
     return rel
 
 
+@router.post(
+    "/relationships:bulk",
+    response_model=list[RelationshipOut],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_relationships_bulk(
+    payload: RelationshipBulkCreate,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many relationships and their inverses in one transaction.
+
+    Rows that already exist are skipped rather than reported as conflicts;
+    the response lists only the rows actually inserted. Any ancestry cycle
+    rejects the whole batch.
+    """
+    tree_id = payload.tree_id
+    await _verify_tree_ownership(tree_id, current_user, db)
+
+    person_ids = {
+        pid for edge in payload.relationships for pid in (edge.person_id, edge.related_person_id)
+    }
+    found = set(
+        await db.scalars(
+            select(Person.id).where(Person.tree_id == tree_id, Person.id == any_uuid(person_ids))
+        )
+    )
+    if missing := person_ids - found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{len(missing)} person(s) not found in tree",
+        )
+
+    rows = {}
+    for edge in payload.relationships:
+        rows[(edge.person_id, edge.related_person_id, edge.relationship_type)] = None
+        inverse_type = INVERSE_RELATIONSHIP.get(edge.relationship_type)
+        if inverse_type:
+            rows[(edge.related_person_id, edge.person_id, inverse_type)] = None
+
+    result = await db.execute(
+        pg_insert(Relationship)
+        .on_conflict_do_nothing(constraint="uq_relationship")
+        .returning(
+            Relationship.id,
+            Relationship.tree_id,
+            Relationship.person_id,
+            Relationship.related_person_id,
+            Relationship.relationship_type,
+        ),
+        [
+            {
+                "tree_id": tree_id,
+                "person_id": person_id,
+                "related_person_id": related_person_id,
+                "relationship_type": relationship_type,
+            }
+            for person_id, related_person_id, relationship_type in rows
+        ],
+    )
+    created = result.all()
+
+    edges = (parent_edge(r.relationship_type, r.person_id, r.related_person_id) for r in created)
+    parent_edges = list(dict.fromkeys(edge for edge in edges if edge is not None))
+    # Checked against the batch as a whole, so cycles closed by edges of this
+    # same request are caught before the closure is touched.
+    if await closes_cycle(db, parent_edges):
+        raise _cycle_conflict()
+    await add_parent_edges(db, tree_id, parent_edges)
+
+    if created:
+        await record_changes(db, tree_id, relationships=created)
+    logger.info(
+        "Relationships bulk created",
+        tree_id=str(tree_id),
+        requested=len(payload.relationships),
+        created=len(created),
+    )
+    return created
+
+
 @router.delete("/relationships/{relationship_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_relationship(
     relationship_id: uuid.UUID,
@@ -121,6 +221,7 @@ async def delete_relationship(
 
     await _verify_tree_ownership(rel.tree_id, current_user, db)
 
+    removed = [rel]
     inverse_type = INVERSE_RELATIONSHIP.get(rel.relationship_type)
     if inverse_type:
         inverse_result = await db.execute(
@@ -133,6 +234,12 @@ async def delete_relationship(
         inverse = inverse_result.scalar_one_or_none()
         if inverse:
             await db.delete(inverse)
+            removed.append(inverse)
 
     await db.delete(rel)
+    edge = parent_edge(rel.relationship_type, rel.person_id, rel.related_person_id)
+    if edge:
+        await db.flush()
+        await remove_parent_edge(db, rel.tree_id, *edge)
+    await record_changes(db, rel.tree_id, removed_relationships=removed)
     logger.info("Relationship deleted", rel_id=str(relationship_id))
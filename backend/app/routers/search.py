@@ -35,7 +35,9 @@ async def search_persons(
     )
 
     if tree_id:
-        tree_result = await db.execute(select(Tree).where(Tree.id == tree_id))
+        tree_result = await db.execute(
+            select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None))
+        )
         tree = tree_result.scalar_one_or_none()
         if not tree:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
@@ -45,9 +47,10 @@ async def search_persons(
 
         query = query.where(Person.tree_id == tree_id)
     else:
+        visible_trees_query = select(Tree.id).where(Tree.deleted_at.is_(None))
         if current_user.role not in (UserRole.admin,):
-            owned_trees_query = select(Tree.id).where(Tree.owner_id == current_user.id)
-            query = query.where(Person.tree_id.in_(owned_trees_query))
+            visible_trees_query = visible_trees_query.where(Tree.owner_id == current_user.id)
+        query = query.where(Person.tree_id.in_(visible_trees_query))
 
     query = query.order_by(Person.last_name, Person.first_name).limit(50)
     result = await db.execute(query)
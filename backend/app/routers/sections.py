@@ -6,43 +6,21 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.deps import CurrentUser, get_current_user
-from app.models.person import Person
+from app.deps import CurrentUser, get_current_user, get_person_with_access
 from app.models.section import PersonSection
-from app.models.tree import Tree
-from app.models.user import UserRole
 from app.schemas.section import SectionCreate, SectionOut, SectionUpdate
 
 router = APIRouter()
 logger = structlog.get_logger()
 
 
-async def _get_person_with_access(
-    person_id: uuid.UUID, current_user, db: AsyncSession
-) -> Person:
-    result = await db.execute(select(Person).where(Person.id == person_id))
-    person = result.scalar_one_or_none()
-    if not person:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found")
-
-    tree_result = await db.execute(select(Tree).where(Tree.id == person.tree_id))
-    tree = tree_result.scalar_one_or_none()
-    if not tree:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
-
-    if tree.owner_id != current_user.id and current_user.role not in (UserRole.admin, UserRole.editor):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-
-    return person
-
-
 @router.get("/persons/{person_id}/sections", response_model=list[SectionOut])
 async def list_sections(
     person_id: uuid.UUID,
     current_user: CurrentUser,
     db: AsyncSession = Depends(get_db),
 ):
-    await _get_person_with_access(person_id, current_user, db)
+    await get_person_with_access(person_id, current_user, db)
     result = await db.execute(
         select(PersonSection)
         .where(PersonSection.person_id == person_id)
@@ -58,7 +36,7 @@ async def create_section(
     current_user: CurrentUser,
     db: AsyncSession = Depends(get_db),
 ):
-    await _get_person_with_access(person_id, current_user, db)
+    await get_person_with_access(person_id, current_user, db)
 
     section = PersonSection(
         person_id=person_id,
@@ -85,7 +63,7 @@ async def update_section(
     if not section:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
 
-    await _get_person_with_access(section.person_id, current_user, db)
+    await get_person_with_access(section.person_id, current_user, db)
 
     if payload.title is not None:
         section.title = payload.title
@@ -110,6 +88,6 @@ async def delete_section(
     if not section:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
 
-    await _get_person_with_access(section.person_id, current_user, db)
+    await get_person_with_access(section.person_id, current_user, db)
     await db.delete(section)
     logger.info("Section deleted", section_id=str(section_id))
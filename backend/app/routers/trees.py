@@ -1,28 +1,67 @@
+import hashlib
 import uuid
-from collections import defaultdict, deque
+from collections import defaultdict
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timezone
+from typing import Annotated, Literal
 
+import numpy as np
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from starlette.background import BackgroundTask
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, all_uuid, any_uuid, get_db
 from app.deps import CurrentUser, get_current_user
+from app.models.person import Person
 from app.models.relationship import Relationship, RelationshipType
 from app.models.tree import Tree
+from app.models.tree_change import ChangeEntity, ChangeOp, TreeChange
+from app.models.tree_purge import TreePurge
 from app.schemas.tree import (
+    GedcomImportOut,
+    NodeCounts,
     NodeData,
+    NodePosition,
+    PathStep,
+    PlaceholderNode,
     ReactFlowEdge,
     ReactFlowNode,
+    RelationshipPathResponse,
+    TreeChangesResponse,
     TreeCreate,
+    TreeMeta,
     TreeNodesResponse,
     TreeOut,
+    TreePurgeOut,
 )
+from app.services.collapse import budget_cut, collapse
+from app.services.export import export_gedcom, export_jsonl
+from app.services.gedcom import import_gedcom
+from app.services.graph_index import TreeGraph, graph_index
+from app.services.kinship import kinship_label, shortest_path
+from app.services.layout import LAYER_SPACING_Y
+from app.services.layout_pool import layout_pool
+from app.services.tree_cache import TreeSnapshot, etag_matches, snapshot_cache, tree_etag
+from app.services.tree_codec import PACKED_MEDIA_TYPES, pack_tree
+from app.services.tree_purge import tree_purger
 
 router = APIRouter()
 logger = structlog.get_logger()
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+STREAM_BATCH_SIZE = 1000
+STREAM_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "jsonl": (export_jsonl, NDJSON_MEDIA_TYPES[0], "jsonl"),
+    "gedcom": (export_gedcom, "text/x-gedcom; charset=utf-8", "ged"),
+}
+
 
 @router.get("/trees", response_model=list[TreeOut])
 async def list_trees(
@@ -30,7 +69,9 @@ async def list_trees(
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
-        select(Tree).where(Tree.owner_id == current_user.id).order_by(Tree.created_at.desc())
+        select(Tree)
+        .where(Tree.owner_id == current_user.id, Tree.deleted_at.is_(None))
+        .order_by(Tree.created_at.desc())
     )
     return result.scalars().all()
 
@@ -49,13 +90,18 @@ async def create_tree(
     return tree
 
 
-@router.delete("/trees/{tree_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/trees/{tree_id}", response_model=TreePurgeOut, status_code=status.HTTP_202_ACCEPTED
+)
 async def delete_tree(
     tree_id: uuid.UUID,
     current_user: CurrentUser,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
+    """Hide the tree at once and purge its rows and files in the background."""
+    result = await db.execute(
+        select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None)).with_for_update()
+    )
     tree = result.scalar_one_or_none()
 
     if not tree:
@@ -64,32 +110,53 @@ async def delete_tree(
     if tree.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not the tree owner")
 
-    await db.delete(tree)
-    logger.info("Tree deleted", tree_id=str(tree_id))
+    now = datetime.now(timezone.utc)
+    tree.deleted_at = now
+    persons_total = await db.scalar(
+        select(func.count()).select_from(Person).where(Person.tree_id == tree_id)
+    )
+    purge = TreePurge(
+        tree_id=tree_id,
+        owner_id=tree.owner_id,
+        persons_total=persons_total,
+        persons_deleted=0,
+        files_deleted=0,
+        requested_at=now,
+    )
+    db.add(purge)
+    snapshot_cache.invalidate(tree_id)
+    graph_index.invalidate(tree_id)
+    tree_purger.start_after_commit(db, tree_id)
+    logger.info("Tree deletion requested", tree_id=str(tree_id), persons=persons_total)
+    return purge
 
 
-@router.get("/trees/{tree_id}/nodes", response_model=TreeNodesResponse)
-async def get_tree_nodes(
+@router.get("/trees/{tree_id}/deletion", response_model=TreePurgeOut)
+async def get_tree_deletion(
     tree_id: uuid.UUID,
     current_user: CurrentUser,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
+    purge = await db.get(TreePurge, tree_id)
+    if purge is None or purge.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree deletion not found")
+    return purge
+
+
+async def _get_owned_tree(tree_id: uuid.UUID, current_user, db: AsyncSession) -> Tree:
+    result = await db.execute(select(Tree).where(Tree.id == tree_id, Tree.deleted_at.is_(None)))
     tree = result.scalar_one_or_none()
     if not tree:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
 
     if tree.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return tree
 
-    from app.models.person import Person
-
-    persons_result = await db.execute(select(Person).where(Person.tree_id == tree_id))
-    persons = persons_result.scalars().all()
-
-    rels_result = await db.execute(select(Relationship).where(Relationship.tree_id == tree_id))
-    relationships = rels_result.scalars().all()
 
+def _build_parent_maps(
+    relationships,
+) -> tuple[dict[uuid.UUID, list[uuid.UUID]], dict[uuid.UUID, list[uuid.UUID]]]:
     children_map: dict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
     parent_map: dict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
 
@@ -98,77 +165,688 @@ async def get_tree_nodes(
             children_map[rel.person_id].append(rel.related_person_id)
             parent_map[rel.related_person_id].append(rel.person_id)
 
-    person_ids = {p.id for p in persons}
-    root_ids = [pid for pid in person_ids if not parent_map.get(pid)]
+    return children_map, parent_map
 
-    generation: dict[uuid.UUID, int] = {}
-    queue: deque[uuid.UUID] = deque()
-
-    for root_id in root_ids:
-        generation[root_id] = 0
-        queue.append(root_id)
-
-    while queue:
-        current_id = queue.popleft()
-        current_gen = generation[current_id]
-        for child_id in children_map.get(current_id, []):
-            if child_id not in generation:
-                generation[child_id] = current_gen + 1
-                queue.append(child_id)
-
-    for p in persons:
-        if p.id not in generation:
-            generation[p.id] = 0
-
-    gen_to_persons: dict[int, list[uuid.UUID]] = defaultdict(list)
-    for pid, gen in generation.items():
-        gen_to_persons[gen].append(pid)
-
-    positions: dict[uuid.UUID, dict[str, float]] = {}
-    for gen, pids in gen_to_persons.items():
-        for idx, pid in enumerate(pids):
-            positions[pid] = {"x": float(idx * 200), "y": float(gen * 200)}
-
-    person_map = {p.id: p for p in persons}
-
-    nodes = []
-    for p in persons:
-        pos = positions.get(p.id, {"x": 0.0, "y": 0.0})
-        nodes.append(
-            ReactFlowNode(
-                id=str(p.id),
-                data=NodeData(
-                    id=str(p.id),
-                    first_name=p.first_name,
-                    last_name=p.last_name,
-                    patronymic=getattr(p, "patronymic", None),
-                    avatar_thumb_url=p.avatar_thumb_url,
-                    birth_date=p.birth_date,
-                ),
-                position=pos,
+
+async def _layout_positions(
+    person_ids: list[uuid.UUID],
+    relationships,
+    generation: dict[uuid.UUID, int] | None = None,
+) -> dict[uuid.UUID, dict[str, float]]:
+    children_map, _ = _build_parent_maps(relationships)
+    index = {pid: i for i, pid in enumerate(person_ids)}
+
+    parent_src: list[int] = []
+    parent_dst: list[int] = []
+    for parent_id, child_ids in children_map.items():
+        if parent_id not in index:
+            continue
+        for child_id in child_ids:
+            if child_id in index:
+                parent_src.append(index[parent_id])
+                parent_dst.append(index[child_id])
+
+    spouse_a: list[int] = []
+    spouse_b: list[int] = []
+    for rel in relationships:
+        if (
+            rel.relationship_type == RelationshipType.spouse
+            and rel.person_id in index
+            and rel.related_person_id in index
+        ):
+            spouse_a.append(index[rel.person_id])
+            spouse_b.append(index[rel.related_person_id])
+
+    layers = None
+    if generation is not None:
+        layers = np.array([generation.get(pid, 0) for pid in person_ids], dtype=np.int64)
+
+    result = await layout_pool.layout(
+        len(person_ids), parent_src, parent_dst, spouse_a, spouse_b, layers=layers
+    )
+    x, y = result.x.tolist(), result.y.tolist()
+    return {pid: {"x": x[i], "y": y[i]} for i, pid in enumerate(person_ids)}
+
+
+async def _graph_layout(graph: TreeGraph) -> TreeSnapshot:
+    """Positions of every person in the graph, plus those caught in parent cycles.
+
+    The shared graph can be patched by a committed write while the layout is
+    awaited, so everything read from it is copied first.
+    """
+    person_ids = list(graph.person_ids)
+    descendants, ancestors = graph.descendant_count.tolist(), graph.ancestor_count.tolist()
+    parent_src, parent_dst = graph.edge_arrays(RelationshipType.parent)
+    spouse_a, spouse_b = graph.edge_arrays(RelationshipType.spouse)
+    result = await layout_pool.layout(
+        len(person_ids), parent_src, parent_dst, spouse_a, spouse_b, key=graph.tree_id
+    )
+    x, y = result.x.tolist(), result.y.tolist()
+    return TreeSnapshot(
+        positions={pid: {"x": x[i], "y": y[i]} for i, pid in enumerate(person_ids)},
+        cycles=[person_ids[i] for i in result.cycles.tolist()],
+        counts={pid: (descendants[i], ancestors[i]) for i, pid in enumerate(person_ids)},
+        fallback=result.fallback,
+    )
+
+
+def _graph_pair_keys(graph: TreeGraph) -> set[tuple[uuid.UUID, uuid.UUID, RelationshipType]]:
+    keys = set()
+    for kind in (RelationshipType.spouse, RelationshipType.sibling):
+        src, dst = graph.edge_arrays(kind)
+        keys.update((graph.person_ids[u], graph.person_ids[v], kind) for u, v in zip(src.tolist(), dst.tolist()))
+    return keys
+
+
+def _person_node(
+    p,
+    position: dict[str, float] | None,
+    expandable: bool = False,
+    counts: tuple[int, int] = (0, 0),
+) -> ReactFlowNode:
+    return ReactFlowNode(
+        id=str(p.id),
+        data=NodeData(
+            id=str(p.id),
+            first_name=p.first_name,
+            last_name=p.last_name,
+            patronymic=getattr(p, "patronymic", None),
+            avatar_thumb_url=p.avatar_thumb_url,
+            birth_date=p.birth_date,
+            expandable=expandable,
+            descendant_count=counts[0],
+            ancestor_count=counts[1],
+        ),
+        position=position or {"x": 0.0, "y": 0.0},
+    )
+
+
+def _is_rendered_edge(rel, present: set[tuple[uuid.UUID, uuid.UUID, RelationshipType]]) -> bool:
+    """Deduplicate edges.
+
+    - parent: emit A→B once (skip inverse "child" direction)
+    - spouse/sibling: emit only one edge per pair (canonical order by id),
+      so the same row id is chosen in full snapshots, change deltas and streams
+
+    ``present`` holds (person_id, related_person_id, type) of spouse/sibling rows.
+    """
+    if rel.relationship_type == RelationshipType.child:
+        return False
+    if rel.relationship_type in (RelationshipType.spouse, RelationshipType.sibling):
+        inverse = (rel.related_person_id, rel.person_id, rel.relationship_type)
+        if str(rel.person_id) > str(rel.related_person_id) and inverse in present:
+            return False
+    return True
+
+
+def _relationship_edge(rel) -> ReactFlowEdge:
+    return ReactFlowEdge(
+        id=str(rel.id),
+        source=str(rel.person_id),
+        target=str(rel.related_person_id),
+        data={"relationship_type": rel.relationship_type.value},
+    )
+
+
+def _pair_keys(relationships) -> set[tuple[uuid.UUID, uuid.UUID, RelationshipType]]:
+    return {
+        (rel.person_id, rel.related_person_id, rel.relationship_type)
+        for rel in relationships
+        if rel.relationship_type in (RelationshipType.spouse, RelationshipType.sibling)
+    }
+
+
+def _build_tree_nodes(
+    persons,
+    relationships,
+    positions: dict[uuid.UUID, dict[str, float]],
+    expandable: set[uuid.UUID] | None = None,
+    cycles: Sequence[uuid.UUID] = (),
+    counts: dict[uuid.UUID, tuple[int, int]] | None = None,
+) -> TreeNodesResponse:
+    expandable = expandable or set()
+    counts = counts or {}
+    nodes = [
+        _person_node(p, positions.get(p.id), p.id in expandable, counts.get(p.id, (0, 0)))
+        for p in persons
+    ]
+
+    present = _pair_keys(relationships)
+    edges = [_relationship_edge(rel) for rel in relationships if _is_rendered_edge(rel, present)]
+
+    meta = TreeMeta(cycle_person_ids=[str(pid) for pid in cycles])
+    return TreeNodesResponse(nodes=nodes, edges=edges, meta=meta)
+
+
+async def _load_layout(db: AsyncSession, tree: Tree) -> TreeSnapshot:
+    """Cached layout of the tree's current version, computing it if needed."""
+    snapshot = snapshot_cache.get(tree.id, tree.version)
+    if snapshot is None:
+        graph = await graph_index.get(db, tree.id, tree.version)
+        snapshot = await _graph_layout(graph)
+        if snapshot.cycles:
+            logger.warning(
+                "Parent cycle in tree", tree_id=str(tree.id), persons=len(snapshot.cycles)
             )
+        if not snapshot.fallback:
+            snapshot_cache.put(tree.id, tree.version, snapshot)
+    return snapshot
+
+
+async def _load_snapshot(db: AsyncSession, tree: Tree, encoding: str = "json") -> TreeSnapshot:
+    """Cached layout of the tree's current version, with a body for ``encoding``.
+
+    ``encoding`` is ``"json"`` (ReactFlow payload) or ``"msgpack"`` (columnar).
+    A second encoding of an already cached version reuses its layout.
+    """
+    snapshot = await _load_layout(db, tree)
+    if encoding in snapshot.bodies:
+        return snapshot
+
+    persons_result = await db.execute(select(Person).where(Person.tree_id == tree.id))
+    persons = persons_result.scalars().all()
+
+    rels_result = await db.execute(select(Relationship).where(Relationship.tree_id == tree.id))
+    relationships = rels_result.scalars().all()
+
+    if encoding == "msgpack":
+        present = _pair_keys(relationships)
+        edges = [rel for rel in relationships if _is_rendered_edge(rel, present)]
+        body = pack_tree(persons, edges, snapshot.positions, snapshot.cycles, snapshot.counts)
+    else:
+        body = _build_tree_nodes(
+            persons, relationships, snapshot.positions, cycles=snapshot.cycles, counts=snapshot.counts
+        ).model_dump_json().encode()
+
+    snapshot.bodies[encoding] = body
+    if not snapshot.fallback:
+        snapshot_cache.put(tree.id, tree.version, snapshot)
+    logger.debug(
+        "Tree snapshot built",
+        tree_id=str(tree.id),
+        version=tree.version,
+        encoding=encoding,
+        size=len(body),
+    )
+    return snapshot
+
+
+def _accepts(accept: str | None, media_types: tuple[str, ...]) -> bool:
+    if not accept:
+        return False
+    return any(part.split(";", 1)[0].strip() in media_types for part in accept.split(","))
+
+
+async def _open_tree_snapshot(tree_id: uuid.UUID) -> tuple[AsyncSession, int]:
+    """A REPEATABLE READ session for streaming, and the tree version its snapshot sees."""
+    db = AsyncSessionLocal()
+    try:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        version = await db.scalar(select(Tree.version).where(Tree.id == tree_id))
+    except BaseException:
+        await db.close()
+        raise
+    return db, version
+
+
+async def _stream_tree_ndjson(
+    db: AsyncSession, tree_id: uuid.UUID, version: int
+) -> AsyncIterator[bytes]:
+    """Yield the tree as a ``{"meta": ...}`` line, then ``{"node": ...}`` / ``{"edge": ...}`` lines.
+
+    The layout comes from the integer graph index; persons and relationship
+    rows are read through server-side cursors and written out as soon as they
+    arrive. ``db`` comes from ``_open_tree_snapshot``, so all passes see the
+    snapshot whose ``version`` the ETag names, regardless of when the request
+    session is closed; it is closed here.
+    """
+    async with db:
+        graph = await graph_index.get(db, tree_id, version)
+        # Read before awaiting the layout; the shared graph may move on meanwhile.
+        present = _graph_pair_keys(graph)
+        layout = await _graph_layout(graph)
+        positions, counts = layout.positions, layout.counts
+
+        meta = TreeMeta(cycle_person_ids=[str(pid) for pid in layout.cycles])
+        buffer = bytearray(b'{"meta":' + meta.model_dump_json().encode() + b"}\n")
+
+        persons = await db.stream_scalars(
+            select(Person)
+            .where(Person.tree_id == tree_id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
         )
+        async for person in persons:
+            node = _person_node(
+                person, positions.get(person.id), counts=counts.get(person.id, (0, 0))
+            )
+            buffer += b'{"node":' + node.model_dump_json().encode() + b"}\n"
+            if len(buffer) >= STREAM_CHUNK_BYTES:
+                db.expunge_all()
+                yield bytes(buffer)
+                buffer.clear()
 
-    # Deduplicate edges:
-    # - parent: emit A→B once (skip inverse "child" direction)
-    # - spouse/sibling: emit only one edge per pair (canonical order by id)
-    edges = []
-    seen_pairs: set[tuple[str, str]] = set()
-    for rel in relationships:
-        if rel.relationship_type == RelationshipType.child:
-            continue
-        if rel.relationship_type in (RelationshipType.spouse, RelationshipType.sibling):
-            pair = tuple(sorted([str(rel.person_id), str(rel.related_person_id)]))
-            if pair in seen_pairs:
+        relationships = await db.stream_scalars(
+            select(Relationship)
+            .where(Relationship.tree_id == tree_id, Relationship.relationship_type != RelationshipType.child)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for rel in relationships:
+            if not _is_rendered_edge(rel, present):
                 continue
-            seen_pairs.add(pair)
-        edges.append(
-            ReactFlowEdge(
-                id=str(rel.id),
-                source=str(rel.person_id),
-                target=str(rel.related_person_id),
-                data={"relationship_type": rel.relationship_type.value},
-            )
+            buffer += b'{"edge":' + _relationship_edge(rel).model_dump_json().encode() + b"}\n"
+            if len(buffer) >= STREAM_CHUNK_BYTES:
+                db.expunge_all()
+                yield bytes(buffer)
+                buffer.clear()
+
+        if buffer:
+            yield bytes(buffer)
+
+
+async def _collapsed_tree_nodes(
+    db: AsyncSession,
+    tree: Tree,
+    collapsed_ids: list[uuid.UUID],
+    max_nodes: int | None,
+) -> TreeNodesResponse:
+    """The tree with hidden branches replaced by placeholders.
+
+    Positions come from the cached full layout, so nodes keep their place as
+    branches are collapsed and expanded; only visible persons are loaded.
+    """
+    snapshot = await _load_layout(db, tree)
+    graph = await graph_index.get(db, tree.id, tree.version)
+
+    collapsed = {graph.index[pid] for pid in collapsed_ids if pid in graph.index}
+    if max_nodes is not None:
+        y = np.fromiter(
+            (snapshot.positions[pid]["y"] for pid in graph.person_ids),
+            dtype=np.float64,
+            count=graph.node_count,
+        )
+        collapsed |= budget_cut(graph, np.rint(y / LAYER_SPACING_Y).astype(np.int64), max_nodes)
+    view = collapse(graph, collapsed)
+
+    visible_ids = [graph.person_ids[i] for i in view.visible.tolist()]
+    window_ids = any_uuid(visible_ids)
+    persons_result = await db.execute(select(Person).where(Person.id == window_ids))
+    rels_result = await db.execute(
+        select(Relationship).where(
+            Relationship.person_id == window_ids,
+            Relationship.related_person_id == window_ids,
         )
+    )
 
-    return TreeNodesResponse(nodes=nodes, edges=edges)
+    visible = set(visible_ids)
+    branches = {graph.person_ids[node]: count for node, count in view.placeholders.items()}
+    response = _build_tree_nodes(
+        persons_result.scalars().all(),
+        rels_result.scalars().all(),
+        snapshot.positions,
+        expandable=set(branches),
+        cycles=[pid for pid in snapshot.cycles if pid in visible],
+        counts=snapshot.counts,
+    )
+    response.placeholders = [
+        PlaceholderNode(
+            id=f"collapsed:{pid}",
+            person_id=str(pid),
+            hidden_count=count,
+            position={
+                "x": snapshot.positions[pid]["x"],
+                "y": snapshot.positions[pid]["y"] + LAYER_SPACING_Y,
+            },
+        )
+        for pid, count in branches.items()
+    ]
+    return response
+
+
+@router.get("/trees/{tree_id}/nodes", response_model=TreeNodesResponse)
+async def get_tree_nodes(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    accept: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    collapsed: list[uuid.UUID] = Query([]),
+    max_nodes: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """The whole tree, or a collapsed view of it.
+
+    ``collapsed`` person ids (and/or a ``max_nodes`` budget, which collapses
+    whole generations top-down) hide branches behind placeholder nodes;
+    collapsed views are always returned as JSON.
+    """
+    tree = await _get_owned_tree(tree_id, current_user, db)
+
+    if collapsed or max_nodes is not None:
+        key = ",".join(sorted(str(pid) for pid in collapsed)) + f"|{max_nodes}"
+        digest = hashlib.blake2s(key.encode(), digest_size=8).hexdigest()
+        etag = tree_etag(tree.id, tree.version, f"collapsed-{digest}")
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        view = await _collapsed_tree_nodes(db, tree, collapsed, max_nodes)
+        return Response(
+            content=view.model_dump_json(), media_type="application/json", headers=headers
+        )
+
+    if _accepts(accept, NDJSON_MEDIA_TYPES):
+        encoding = "ndjson"
+    elif _accepts(accept, PACKED_MEDIA_TYPES):
+        encoding = "msgpack"
+    else:
+        encoding = "json"
+
+    if encoding == "ndjson":
+        # The body is read from its own snapshot; tag it with that snapshot's version.
+        stream_db, version = await _open_tree_snapshot(tree.id)
+        etag = tree_etag(tree.id, version, encoding)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept"}
+        if etag_matches(if_none_match, etag):
+            await stream_db.close()
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return StreamingResponse(
+            _stream_tree_ndjson(stream_db, tree.id, version),
+            media_type=NDJSON_MEDIA_TYPES[0],
+            headers=headers,
+            # Closes the session even if the body is never iterated.
+            background=BackgroundTask(stream_db.close),
+        )
+
+    etag = tree_etag(tree.id, tree.version, None if encoding == "json" else encoding)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    snapshot = await _load_snapshot(db, tree, encoding)
+    if snapshot.fallback:
+        # Don't let the client revalidate into the stopgap layout for this version.
+        headers = {"Cache-Control": "no-store", "Vary": "Accept"}
+    media_type = PACKED_MEDIA_TYPES[0] if encoding == "msgpack" else "application/json"
+    return Response(content=snapshot.bodies[encoding], media_type=media_type, headers=headers)
+
+
+@router.get("/trees/{tree_id}/changes", response_model=TreeChangesResponse)
+async def get_tree_changes(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    since: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    tree = await _get_owned_tree(tree_id, current_user, db)
+    if since == tree.version:
+        return TreeChangesResponse(version=tree.version, since=since)
+
+    changes_result = await db.execute(
+        select(TreeChange.version, TreeChange.entity_type, TreeChange.entity_id, TreeChange.op)
+        .where(
+            TreeChange.tree_id == tree_id,
+            TreeChange.version > since,
+            TreeChange.version <= tree.version,
+        )
+        .order_by(TreeChange.id)
+    )
+    changes = changes_result.all()
+
+    # Only an unbroken run of logged versions can be replayed; versions older
+    # than the change log, from the future, with a gap, or spanning a bulk
+    # rewrite (import) force a full reload.
+    logged_versions = {change.version for change in changes}
+    if (
+        since > tree.version
+        or len(logged_versions) != tree.version - since
+        or any(change.op == ChangeOp.reload for change in changes)
+    ):
+        return TreeChangesResponse(version=tree.version, since=since, full_reload=True)
+
+    latest: dict[tuple[ChangeEntity, uuid.UUID], ChangeOp] = {}
+    for change in changes:
+        latest[(change.entity_type, change.entity_id)] = change.op
+
+    def _ids(entity: ChangeEntity, op: ChangeOp) -> list[uuid.UUID]:
+        return [eid for (etype, eid), eop in latest.items() if etype == entity and eop == op]
+
+    upserted_persons = _ids(ChangeEntity.person, ChangeOp.upsert)
+    upserted_rels = _ids(ChangeEntity.relationship, ChangeOp.upsert)
+
+    persons_result = await db.execute(
+        select(Person).where(Person.id == any_uuid(upserted_persons))
+    )
+    rels_result = await db.execute(
+        select(Relationship).where(Relationship.id == any_uuid(upserted_rels))
+    )
+
+    snapshot = await _load_layout(db, tree)
+    delta = _build_tree_nodes(
+        persons_result.scalars().all(),
+        rels_result.scalars().all(),
+        snapshot.positions,
+        counts=snapshot.counts,
+    )
+
+    # Only ship positions that moved since the client's version; if that
+    # layout is no longer cached, every position is sent (still without node data).
+    previous = snapshot_cache.get(tree.id, since)
+    refreshed = set(upserted_persons)
+    moved = [
+        NodePosition(id=str(pid), position=position)
+        for pid, position in snapshot.positions.items()
+        if pid not in refreshed
+        and (previous is None or previous.positions.get(pid) != position)
+    ]
+    recounted = [
+        NodeCounts(id=str(pid), descendant_count=counts[0], ancestor_count=counts[1])
+        for pid, counts in snapshot.counts.items()
+        if pid not in refreshed and (previous is None or previous.counts.get(pid) != counts)
+    ]
+
+    return TreeChangesResponse(
+        version=tree.version,
+        since=since,
+        nodes=delta.nodes,
+        edges=delta.edges,
+        removed_node_ids=[str(pid) for pid in _ids(ChangeEntity.person, ChangeOp.delete)],
+        removed_edge_ids=[str(rid) for rid in _ids(ChangeEntity.relationship, ChangeOp.delete)],
+        moved=moved,
+        recounted=recounted,
+    )
+
+
+async def _collect_window(
+    db: AsyncSession,
+    tree_id: uuid.UUID,
+    person_id: uuid.UUID,
+    ancestor_depth: int,
+    descendant_depth: int,
+    collateral_depth: int,
+) -> dict[uuid.UUID, int]:
+    """Walk parent edges around the focal person with recursive CTEs.
+
+    Returns each reached person's generation offset from the focal person
+    (negative for ancestors). Collaterals are found by descending up to
+    ``collateral_depth`` generations from every ancestor in the window. The
+    recursive parts use UNION, so pedigree collapse does not multiply rows,
+    and collateral descent never re-enters the focal person's own line.
+    """
+    is_parent_edge = (Relationship.tree_id == tree_id) & (
+        Relationship.relationship_type == RelationshipType.parent
+    )
+    focal = literal(person_id, PG_UUID(as_uuid=True))
+
+    ancestors = select(focal.label("person_id"), literal(0).label("depth")).cte(
+        "ancestors", recursive=True
+    )
+    ancestors = ancestors.union(
+        select(Relationship.person_id, ancestors.c.depth + 1)
+        .join(ancestors, Relationship.related_person_id == ancestors.c.person_id)
+        .where(is_parent_edge, ancestors.c.depth < ancestor_depth)
+    )
+
+    descendants = select(focal.label("person_id"), literal(0).label("depth")).cte(
+        "descendants", recursive=True
+    )
+    descendants = descendants.union(
+        select(Relationship.related_person_id, descendants.c.depth + 1)
+        .join(descendants, Relationship.person_id == descendants.c.person_id)
+        .where(is_parent_edge, descendants.c.depth < descendant_depth)
+    )
+
+    # Each ancestor starts one descent, from its nearest generation.
+    collaterals = (
+        select(
+            ancestors.c.person_id,
+            func.min(ancestors.c.depth).label("up"),
+            literal(0).label("down"),
+        )
+        .where(ancestors.c.depth > 0)
+        .group_by(ancestors.c.person_id)
+        .cte("collaterals", recursive=True)
+    )
+    collaterals = collaterals.union(
+        select(Relationship.related_person_id, collaterals.c.up, collaterals.c.down + 1)
+        .join(collaterals, Relationship.person_id == collaterals.c.person_id)
+        .where(
+            is_parent_edge,
+            collaterals.c.down < collateral_depth,
+            Relationship.related_person_id.not_in(select(ancestors.c.person_id)),
+        )
+    )
+
+    window_query = union_all(
+        select(ancestors.c.person_id, -ancestors.c.depth),
+        select(descendants.c.person_id, descendants.c.depth),
+        select(collaterals.c.person_id, collaterals.c.down - collaterals.c.up).where(
+            collaterals.c.down > 0
+        ),
+    )
+    rows = (await db.execute(window_query)).all()
+
+    generation: dict[uuid.UUID, int] = {}
+    for pid, offset in rows:
+        generation.setdefault(pid, offset)
+
+    # Spouses (and, when collaterals are requested, explicit sibling links)
+    # sit on the same generation as the person they are attached to.
+    side_types = [RelationshipType.spouse]
+    if collateral_depth > 0:
+        side_types.append(RelationshipType.sibling)
+    side_result = await db.execute(
+        select(Relationship.person_id, Relationship.related_person_id).where(
+            Relationship.person_id == any_uuid(generation),
+            Relationship.relationship_type.in_(side_types),
+        )
+    )
+    for pid, related_id in side_result.all():
+        generation.setdefault(related_id, generation[pid])
+
+    return generation
+
+
+@router.get("/trees/{tree_id}/subgraph", response_model=TreeNodesResponse)
+async def get_tree_subgraph(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    person_id: uuid.UUID = Query(...),
+    ancestor_depth: int = Query(2, ge=0, le=25),
+    descendant_depth: int = Query(2, ge=0, le=25),
+    collateral_depth: int = Query(1, ge=0, le=10),
+    db: AsyncSession = Depends(get_db),
+):
+    tree = await _get_owned_tree(tree_id, current_user, db)
+
+    focal_result = await db.execute(
+        select(Person.id).where(Person.id == person_id, Person.tree_id == tree_id)
+    )
+    if focal_result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found in tree")
+
+    generation = await _collect_window(
+        db, tree_id, person_id, ancestor_depth, descendant_depth, collateral_depth
+    )
+    window_ids = any_uuid(generation)
+
+    persons_result = await db.execute(select(Person).where(Person.id == window_ids))
+    persons = persons_result.scalars().all()
+
+    rels_result = await db.execute(
+        select(Relationship).where(
+            Relationship.person_id == window_ids,
+            Relationship.related_person_id == window_ids,
+        )
+    )
+    relationships = rels_result.scalars().all()
+
+    boundary_result = await db.execute(
+        select(Relationship.person_id)
+        .where(
+            Relationship.person_id == window_ids,
+            Relationship.related_person_id != all_uuid(generation),
+        )
+        .distinct()
+    )
+    expandable = set(boundary_result.scalars().all())
+
+    graph = await graph_index.get(db, tree.id, tree.version)
+    counts = {p.id: graph.counts(p.id) for p in persons}
+
+    positions = await _layout_positions([p.id for p in persons], relationships, generation)
+    return _build_tree_nodes(persons, relationships, positions, expandable, counts=counts)
+
+
+@router.get("/trees/{tree_id}/path", response_model=RelationshipPathResponse)
+async def get_relationship_path(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    from_id: uuid.UUID = Query(..., alias="from"),
+    to_id: uuid.UUID = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_db),
+):
+    tree = await _get_owned_tree(tree_id, current_user, db)
+    graph = await graph_index.get(db, tree.id, tree.version)
+
+    source, target = graph.index.get(from_id), graph.index.get(to_id)
+    if source is None or target is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Person not found in tree")
+
+    path = shortest_path(graph, source, target)
+    if path is None:
+        return RelationshipPathResponse(from_id=from_id, to_id=to_id, found=False)
+
+    return RelationshipPathResponse(
+        from_id=from_id,
+        to_id=to_id,
+        found=True,
+        steps=[PathStep(person_id=graph.person_ids[node], relationship=step) for node, step in path],
+        label=kinship_label([step for _, step in path]),
+    )
+
+
+@router.post(
+    "/trees/{tree_id}/import/gedcom",
+    response_model=GedcomImportOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_tree_gedcom(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    await _get_owned_tree(tree_id, current_user, db)
+    result = await import_gedcom(db, tree_id, file.file)
+    return GedcomImportOut(persons=result.persons, relationships=result.relationships)
+
+
+@router.get("/trees/{tree_id}/export")
+async def export_tree(
+    tree_id: uuid.UUID,
+    current_user: CurrentUser,
+    export_format: Literal["jsonl", "gedcom"] = Query("jsonl", alias="format"),
+    db: AsyncSession = Depends(get_db),
+):
+    tree = await _get_owned_tree(tree_id, current_user, db)
+    stream, media_type, extension = EXPORT_FORMATS[export_format]
+    headers = {"Content-Disposition": f'attachment; filename="tree-{tree.id}.{extension}"'}
+    return StreamingResponse(stream(tree.id), media_type=media_type, headers=headers)
@@ -1,9 +1,12 @@
 import uuid
 from datetime import date, datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.person import Gender
+from app.schemas.media import DocumentOut, PhotoOut
+from app.schemas.relationship import RelationshipWithPersonOut
+from app.schemas.section import SectionOut
 
 
 class PersonCreate(BaseModel):
@@ -20,6 +23,24 @@ class PersonCreate(BaseModel):
     residence: str | None = None
 
 
+MAX_BULK_PERSONS = 50_000
+
+
+class PersonBulkCreate(BaseModel):
+    persons: list[PersonCreate] = Field(min_length=1, max_length=MAX_BULK_PERSONS)
+
+
+class PersonBulkCreated(BaseModel):
+    ids: list[uuid.UUID]
+
+
+MAX_BATCH_GET_PERSONS = 500
+
+
+class PersonBatchGet(BaseModel):
+    ids: list[uuid.UUID] = Field(min_length=1, max_length=MAX_BATCH_GET_PERSONS)
+
+
 class PersonUpdate(BaseModel):
     first_name: str | None = None
     last_name: str | None = None
@@ -54,3 +75,31 @@ class PersonOut(BaseModel):
     avatar_thumb_url: str | None
     created_at: datetime
     updated_at: datetime
+
+
+class PersonProfile(PersonOut):
+    relationships: list[RelationshipWithPersonOut] = []
+    photos: list[PhotoOut] = []
+    documents: list[DocumentOut] = []
+    sections: list[SectionOut] = []
+
+
+class LineageEntry(BaseModel):
+    generation: int
+    person: PersonOut
+
+
+class LineagePage(BaseModel):
+    items: list[LineageEntry]
+    next_cursor: str | None = None
+
+
+class DuplicatePair(BaseModel):
+    person: PersonOut
+    other: PersonOut
+    score: float
+
+
+class PersonMerge(BaseModel):
+    survivor_id: uuid.UUID
+    duplicate_id: uuid.UUID
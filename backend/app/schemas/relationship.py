@@ -1,7 +1,7 @@
 import uuid
 from datetime import date
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.relationship import RelationshipType
 
@@ -13,6 +13,20 @@ class RelationshipCreate(BaseModel):
     tree_id: uuid.UUID
 
 
+MAX_BULK_RELATIONSHIPS = 10_000
+
+
+class RelationshipEdge(BaseModel):
+    person_id: uuid.UUID
+    related_person_id: uuid.UUID
+    relationship_type: RelationshipType
+
+
+class RelationshipBulkCreate(BaseModel):
+    tree_id: uuid.UUID
+    relationships: list[RelationshipEdge] = Field(min_length=1, max_length=MAX_BULK_RELATIONSHIPS)
+
+
 class RelationshipOut(BaseModel):
     model_config = {"from_attributes": True}
 
@@ -4,6 +4,8 @@ from typing import Any
 
 from pydantic import BaseModel
 
+from app.models.relationship import RelationshipType
+
 
 class TreeCreate(BaseModel):
     name: str
@@ -25,6 +27,9 @@ class NodeData(BaseModel):
     patronymic: str | None
     avatar_thumb_url: str | None
     birth_date: date | None
+    expandable: bool = False
+    descendant_count: int = 0
+    ancestor_count: int = 0
 
 
 class ReactFlowNode(BaseModel):
@@ -40,6 +45,73 @@ class ReactFlowEdge(BaseModel):
     data: dict = {}
 
 
+class PlaceholderNode(BaseModel):
+    """Stands in for a collapsed person's hidden branch."""
+
+    id: str
+    person_id: str
+    hidden_count: int
+    position: dict[str, float]
+
+
+class TreeMeta(BaseModel):
+    cycle_person_ids: list[str] = []
+
+
 class TreeNodesResponse(BaseModel):
     nodes: list[ReactFlowNode]
     edges: list[ReactFlowEdge]
+    placeholders: list[PlaceholderNode] = []
+    meta: TreeMeta = TreeMeta()
+
+
+class NodePosition(BaseModel):
+    id: str
+    position: dict[str, float]
+
+
+class NodeCounts(BaseModel):
+    id: str
+    descendant_count: int
+    ancestor_count: int
+
+
+class TreeChangesResponse(BaseModel):
+    version: int
+    since: int
+    full_reload: bool = False
+    nodes: list[ReactFlowNode] = []
+    edges: list[ReactFlowEdge] = []
+    removed_node_ids: list[str] = []
+    removed_edge_ids: list[str] = []
+    moved: list[NodePosition] = []
+    recounted: list[NodeCounts] = []
+
+
+class PathStep(BaseModel):
+    person_id: uuid.UUID
+    relationship: RelationshipType
+
+
+class RelationshipPathResponse(BaseModel):
+    from_id: uuid.UUID
+    to_id: uuid.UUID
+    found: bool
+    steps: list[PathStep] = []
+    label: str | None = None
+
+
+class GedcomImportOut(BaseModel):
+    persons: int
+    relationships: int
+
+
+class TreePurgeOut(BaseModel):
+    model_config = {"from_attributes": True}
+
+    tree_id: uuid.UUID
+    persons_total: int
+    persons_deleted: int
+    files_deleted: int
+    requested_at: datetime
+    finished_at: datetime | None = None
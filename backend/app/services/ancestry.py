@@ -0,0 +1,318 @@
+"""Maintenance of the ``ancestry_closure`` table.
+
+A parent edge exists when either a ``parent`` row (parent → child) or its
+``child`` inverse (child → parent) is stored. Adding an edge inserts every
+(ancestor-or-parent, descendant-or-child) pair in one statement, and a batch
+of edges is linked the same way by chaining its edges through the closure.
+Removing one drops that same region and recomputes it from the remaining edges, walking
+raw relationship rows only inside the removed edge's descendant set and
+reusing intact closure rows everywhere else.
+"""
+import uuid
+
+from sqlalchemy import Integer, delete, exists, func, literal, select, true, union
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import all_uuid, any_uuid
+from app.models.ancestry import AncestryClosure
+from app.models.person import Person
+from app.models.relationship import Relationship, RelationshipType
+
+# Recursion bound for rebuilds and repairs, so cycles in legacy data terminate.
+MAX_CLOSURE_DEPTH = 1000
+
+CLOSURE_COLUMNS = ["tree_id", "ancestor_id", "descendant_id", "depth"]
+
+
+def parent_edge(
+    relationship_type: RelationshipType, person_id: uuid.UUID, related_person_id: uuid.UUID
+) -> tuple[uuid.UUID, uuid.UUID] | None:
+    """``(parent_id, child_id)`` expressed by a relationship row, if any."""
+    if relationship_type == RelationshipType.parent:
+        return person_id, related_person_id
+    if relationship_type == RelationshipType.child:
+        return related_person_id, person_id
+    return None
+
+
+def _uuid(value: uuid.UUID):
+    return literal(value, PG_UUID(as_uuid=True))
+
+
+def tree_parent_edges(tree_id: uuid.UUID):
+    """CTE of ``(parent_id, child_id)`` for every parent edge in a tree, whichever row stores it."""
+    return union(
+        select(
+            Relationship.person_id.label("parent_id"),
+            Relationship.related_person_id.label("child_id"),
+        ).where(
+            Relationship.tree_id == tree_id,
+            Relationship.relationship_type == RelationshipType.parent,
+        ),
+        select(Relationship.related_person_id, Relationship.person_id).where(
+            Relationship.tree_id == tree_id,
+            Relationship.relationship_type == RelationshipType.child,
+        ),
+    ).cte("edges")
+
+
+def _upsert_closure(rows):
+    stmt = pg_insert(AncestryClosure).from_select(CLOSURE_COLUMNS, rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[AncestryClosure.ancestor_id, AncestryClosure.descendant_id],
+        set_={"depth": func.least(AncestryClosure.depth, stmt.excluded.depth)},
+    )
+
+
+async def is_ancestor(db: AsyncSession, ancestor_id: uuid.UUID, descendant_id: uuid.UUID) -> bool:
+    result = await db.execute(
+        select(
+            exists().where(
+                AncestryClosure.ancestor_id == ancestor_id,
+                AncestryClosure.descendant_id == descendant_id,
+            )
+        )
+    )
+    return bool(result.scalar())
+
+
+def _batch_spans(edges: list[tuple[uuid.UUID, uuid.UUID]]):
+    """CTEs chaining a batch of new ``(parent_id, child_id)`` edges through the closure.
+
+    ``links`` joins edge ``src`` to edge ``dst`` when the child of ``src`` is
+    (or already is an ancestor of) the parent of ``dst``; ``chain`` lists
+    every chain of new edges by its first and last edge, with the depth it
+    spans. The walk is bounded by the batch size, not by the tree.
+    """
+    batch = (
+        select(
+            func.unnest(literal(list(range(len(edges))), ARRAY(Integer))).label("edge"),
+            func.unnest(
+                literal([parent for parent, _ in edges], ARRAY(PG_UUID(as_uuid=True)))
+            ).label("parent_id"),
+            func.unnest(
+                literal([child for _, child in edges], ARRAY(PG_UUID(as_uuid=True)))
+            ).label("child_id"),
+        )
+    ).cte("batch")
+    src, dst = batch.alias("src"), batch.alias("dst")
+    links = union(
+        select(src.c.edge.label("src"), dst.c.edge.label("dst"), literal(0).label("gap")).join_from(
+            src, dst, dst.c.parent_id == src.c.child_id
+        ),
+        select(src.c.edge, dst.c.edge, AncestryClosure.depth)
+        .join_from(src, AncestryClosure, AncestryClosure.ancestor_id == src.c.child_id)
+        .join(dst, dst.c.parent_id == AncestryClosure.descendant_id),
+    ).cte("links")
+
+    chain = select(
+        batch.c.edge.label("first_edge"),
+        batch.c.edge.label("last_edge"),
+        literal(1).label("depth"),
+        literal(1).label("hops"),
+    ).cte("chain", recursive=True)
+    chain = chain.union(
+        select(chain.c.first_edge, links.c.dst, chain.c.depth + links.c.gap + 1, chain.c.hops + 1)
+        .join(links, links.c.src == chain.c.last_edge)
+        .where(chain.c.hops < len(edges))
+    )
+    return batch, links, chain
+
+
+async def closes_cycle(db: AsyncSession, edges: list[tuple[uuid.UUID, uuid.UUID]]) -> bool:
+    """Whether adding the ``(parent_id, child_id)`` edges would close a parent cycle.
+
+    Call it before ``add_parent_edges``: a cycle is a chain of new edges whose
+    last child is, or is an ancestor of, its first parent.
+    """
+    if not edges:
+        return False
+    _, links, chain = _batch_spans(edges)
+    result = await db.execute(
+        select(exists().where(links.c.src == chain.c.last_edge, links.c.dst == chain.c.first_edge))
+    )
+    return bool(result.scalar())
+
+
+async def add_parent_edges(
+    db: AsyncSession, tree_id: uuid.UUID, edges: list[tuple[uuid.UUID, uuid.UUID]]
+) -> None:
+    """Link a batch of new edges in one statement, chains within the batch included.
+
+    Every chain of new edges pairs its first parent and that parent's
+    ancestors with its last child and that child's descendants. Callers must
+    reject batches that would close a cycle (see ``closes_cycle``).
+    """
+    if not edges:
+        return
+    batch, _, chain = _batch_spans(edges)
+    up = union(
+        select(batch.c.edge, batch.c.parent_id.label("ancestor_id"), literal(0).label("depth")),
+        select(batch.c.edge, AncestryClosure.ancestor_id, AncestryClosure.depth).join(
+            AncestryClosure, AncestryClosure.descendant_id == batch.c.parent_id
+        ),
+    ).subquery("up")
+    down = union(
+        select(batch.c.edge, batch.c.child_id.label("descendant_id"), literal(0).label("depth")),
+        select(batch.c.edge, AncestryClosure.descendant_id, AncestryClosure.depth).join(
+            AncestryClosure, AncestryClosure.ancestor_id == batch.c.child_id
+        ),
+    ).subquery("down")
+
+    rows = (
+        select(
+            _uuid(tree_id),
+            up.c.ancestor_id,
+            down.c.descendant_id,
+            func.min(up.c.depth + chain.c.depth + down.c.depth),
+        )
+        .join_from(chain, up, up.c.edge == chain.c.first_edge)
+        .join(down, down.c.edge == chain.c.last_edge)
+        .group_by(up.c.ancestor_id, down.c.descendant_id)
+    )
+    await db.execute(_upsert_closure(rows))
+
+
+async def add_parent_edge(
+    db: AsyncSession, tree_id: uuid.UUID, parent_id: uuid.UUID, child_id: uuid.UUID
+) -> None:
+    """Link the parent and its ancestors to the child and its descendants.
+
+    Callers must reject edges that would close a cycle (see ``is_ancestor``).
+    """
+    up = union(
+        select(_uuid(parent_id).label("ancestor_id"), literal(0).label("depth")),
+        select(AncestryClosure.ancestor_id, AncestryClosure.depth).where(
+            AncestryClosure.descendant_id == parent_id
+        ),
+    ).subquery("up")
+    down = union(
+        select(_uuid(child_id).label("descendant_id"), literal(0).label("depth")),
+        select(AncestryClosure.descendant_id, AncestryClosure.depth).where(
+            AncestryClosure.ancestor_id == child_id
+        ),
+    ).subquery("down")
+
+    rows = select(
+        _uuid(tree_id),
+        up.c.ancestor_id,
+        down.c.descendant_id,
+        up.c.depth + down.c.depth + 1,
+    ).join_from(up, down, true())
+    await db.execute(_upsert_closure(rows))
+
+
+async def _ancestor_ids(db: AsyncSession, person_id: uuid.UUID) -> list[uuid.UUID]:
+    result = await db.scalars(
+        select(AncestryClosure.ancestor_id).where(AncestryClosure.descendant_id == person_id)
+    )
+    return list(result)
+
+
+async def _descendant_ids(db: AsyncSession, person_id: uuid.UUID) -> list[uuid.UUID]:
+    result = await db.scalars(
+        select(AncestryClosure.descendant_id).where(AncestryClosure.ancestor_id == person_id)
+    )
+    return list(result)
+
+
+async def remove_parent_edge(
+    db: AsyncSession, tree_id: uuid.UUID, parent_id: uuid.UUID, child_id: uuid.UUID
+) -> None:
+    """Repair the closure after the edge's relationship rows were deleted and flushed."""
+    up_ids = [parent_id, *await _ancestor_ids(db, parent_id)]
+    down_ids = [child_id, *await _descendant_ids(db, child_id)]
+    await _repair_closure(db, tree_id, up_ids, down_ids)
+
+
+async def remove_person_edges(db: AsyncSession, tree_id: uuid.UUID, person_id: uuid.UUID) -> None:
+    """Repair the closure after all of a person's relationship rows were deleted.
+
+    Paths through the person are dropped in one pass over their ancestors and
+    descendants; the person's own rows go with the person (ON DELETE CASCADE).
+    """
+    up_ids = await _ancestor_ids(db, person_id)
+    down_ids = await _descendant_ids(db, person_id)
+    if up_ids and down_ids:
+        await _repair_closure(db, tree_id, up_ids, down_ids)
+
+
+async def _repair_closure(
+    db: AsyncSession, tree_id: uuid.UUID, up_ids: list[uuid.UUID], down_ids: list[uuid.UUID]
+) -> None:
+    """Drop every (up, down) pair and re-derive the ones still connected."""
+    await db.execute(
+        delete(AncestryClosure).where(
+            AncestryClosure.ancestor_id == any_uuid(up_ids),
+            AncestryClosure.descendant_id == any_uuid(down_ids),
+        )
+    )
+
+    # Walk up from every affected descendant. Only nodes inside the affected
+    # set need raw edges; anyone outside it still has a correct closure.
+    edges = tree_parent_edges(tree_id)
+    reach = (
+        select(
+            Person.id.label("node"),
+            Person.id.label("descendant_id"),
+            literal(0).label("depth"),
+        )
+        .where(Person.id == any_uuid(down_ids))
+        .cte("reach", recursive=True)
+    )
+    reach = reach.union(
+        select(edges.c.parent_id, reach.c.descendant_id, reach.c.depth + 1)
+        .join(reach, edges.c.child_id == reach.c.node)
+        .where(reach.c.node == any_uuid(down_ids), reach.c.depth < MAX_CLOSURE_DEPTH)
+    )
+
+    candidates = union(
+        select(
+            reach.c.node.label("ancestor_id"), reach.c.descendant_id, reach.c.depth
+        ).where(reach.c.depth > 0),
+        select(AncestryClosure.ancestor_id, reach.c.descendant_id, reach.c.depth + AncestryClosure.depth)
+        .join(AncestryClosure, AncestryClosure.descendant_id == reach.c.node)
+        .where(reach.c.depth > 0, reach.c.node != all_uuid(down_ids)),
+    ).subquery("candidates")
+
+    rows = (
+        select(
+            _uuid(tree_id),
+            candidates.c.ancestor_id,
+            candidates.c.descendant_id,
+            func.min(candidates.c.depth),
+        )
+        .where(
+            candidates.c.ancestor_id == any_uuid(up_ids),
+            candidates.c.ancestor_id != candidates.c.descendant_id,
+        )
+        .group_by(candidates.c.ancestor_id, candidates.c.descendant_id)
+    )
+    await db.execute(_upsert_closure(rows))
+
+
+async def rebuild_tree_closure(db: AsyncSession, tree_id: uuid.UUID) -> int:
+    """Recompute the closure of one tree from its relationship rows."""
+    await db.execute(delete(AncestryClosure).where(AncestryClosure.tree_id == tree_id))
+
+    edges = tree_parent_edges(tree_id)
+    walk = select(
+        edges.c.parent_id.label("ancestor_id"),
+        edges.c.child_id.label("descendant_id"),
+        literal(1).label("depth"),
+    ).cte("walk", recursive=True)
+    walk = walk.union(
+        select(walk.c.ancestor_id, edges.c.child_id, walk.c.depth + 1)
+        .join(edges, edges.c.parent_id == walk.c.descendant_id)
+        .where(walk.c.depth < MAX_CLOSURE_DEPTH)
+    )
+    rows = (
+        select(_uuid(tree_id), walk.c.ancestor_id, walk.c.descendant_id, func.min(walk.c.depth))
+        .where(walk.c.ancestor_id != walk.c.descendant_id)
+        .group_by(walk.c.ancestor_id, walk.c.descendant_id)
+    )
+    result = await db.execute(pg_insert(AncestryClosure).from_select(CLOSURE_COLUMNS, rows))
+    return result.rowcount
@@ -0,0 +1,152 @@
+"""Set-based inserts for batches of rows.
+
+Up to ``COPY_THRESHOLD`` rows go through SQLAlchemy's "insertmanyvalues"
+path: multi-row ``INSERT ... VALUES ... RETURNING`` statements, with the
+returned ids sorted back into parameter order. Larger batches use the
+asyncpg COPY protocol with ids generated client-side, which avoids
+rendering and parsing tens of thousands of bind parameters. Relationship
+rows from imports go through a COPY-fed staging table so they can be
+validated and de-duplicated in one set-based INSERT.
+"""
+import uuid
+from collections.abc import Sequence
+
+from sqlalchemy import Column, Enum, MetaData, Table, insert, literal, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.person import Gender, Person
+from app.models.relationship import Relationship, RelationshipType
+
+COPY_THRESHOLD = 5000
+
+PERSON_FIELDS = [
+    "first_name",
+    "last_name",
+    "patronymic",
+    "maiden_name",
+    "gender",
+    "birth_date",
+    "birth_place",
+    "death_date",
+    "death_place",
+    "burial_place",
+    "residence",
+]
+
+
+async def copy_records(
+    db: AsyncSession, table: Table, columns: Sequence[str], records: Sequence[tuple]
+) -> None:
+    """COPY ``records`` into ``table`` on the session's connection.
+
+    Runs inside the session's transaction, which callers must already have
+    started by executing a statement (e.g. their access check).
+    """
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table.name, columns=list(columns), records=records
+    )
+
+
+def _person_record(person_id: uuid.UUID, tree_id: uuid.UUID, row: dict) -> tuple:
+    values = [row.get(field) for field in PERSON_FIELDS]
+    gender = PERSON_FIELDS.index("gender")
+    if values[gender] is not None:
+        values[gender] = Gender(values[gender]).value
+    return (person_id, tree_id, *values)
+
+
+async def copy_persons(
+    db: AsyncSession, tree_id: uuid.UUID, ids: Sequence[uuid.UUID], rows: Sequence[dict]
+) -> None:
+    """COPY person rows with caller-assigned ids."""
+    await copy_records(
+        db,
+        Person.__table__,
+        ["id", "tree_id", *PERSON_FIELDS],
+        [_person_record(pid, tree_id, row) for pid, row in zip(ids, rows)],
+    )
+
+
+async def insert_persons(
+    db: AsyncSession, tree_id: uuid.UUID, rows: Sequence[dict]
+) -> list[uuid.UUID]:
+    """Insert person rows (dicts keyed by ``PERSON_FIELDS``); return ids in input order."""
+    if not rows:
+        return []
+
+    if len(rows) >= COPY_THRESHOLD:
+        ids = [uuid.uuid4() for _ in rows]
+        await copy_persons(db, tree_id, ids, rows)
+        return ids
+
+    result = await db.execute(
+        insert(Person).returning(Person.id, sort_by_parameter_order=True),
+        [{"tree_id": tree_id, **{f: row.get(f) for f in PERSON_FIELDS}} for row in rows],
+    )
+    return list(result.scalars())
+
+
+class RelationshipStaging:
+    """Temporary table collecting relationship rows before they are validated.
+
+    Rows are COPYed in as they are produced, in any order and possibly
+    duplicated; ``flush`` then inserts those whose persons exist in the tree,
+    skipping ones already stored. The table is dropped on commit.
+    """
+
+    def __init__(self, db: AsyncSession, name: str = "relationship_staging") -> None:
+        self.db = db
+        self.table = Table(
+            name,
+            MetaData(),
+            Column("person_id", PG_UUID(as_uuid=True), nullable=False),
+            Column("related_person_id", PG_UUID(as_uuid=True), nullable=False),
+            Column(
+                "relationship_type",
+                Enum(RelationshipType, name="relationshiptype", create_type=False),
+                nullable=False,
+            ),
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP",
+        )
+
+    async def create(self) -> None:
+        connection = await self.db.connection()
+        await connection.run_sync(self.table.create)
+
+    async def add(self, edges: Sequence[tuple[uuid.UUID, uuid.UUID, RelationshipType]]) -> None:
+        if edges:
+            await copy_records(
+                self.db,
+                self.table,
+                ["person_id", "related_person_id", "relationship_type"],
+                [(a, b, RelationshipType(kind).value) for a, b, kind in edges],
+            )
+
+    async def flush(self, tree_id: uuid.UUID) -> int:
+        """Insert the staged rows into ``relationships``; return how many were new."""
+        staged = self.table.c
+        person = aliased(Person)
+        related = aliased(Person)
+        rows = (
+            select(
+                literal(tree_id, PG_UUID(as_uuid=True)),
+                staged.person_id,
+                staged.related_person_id,
+                staged.relationship_type,
+            )
+            .join(person, person.id == staged.person_id)
+            .join(related, related.id == staged.related_person_id)
+            .where(person.tree_id == tree_id, related.tree_id == tree_id)
+        )
+        result = await self.db.execute(
+            pg_insert(Relationship)
+            .from_select(["tree_id", "person_id", "related_person_id", "relationship_type"], rows)
+            .on_conflict_do_nothing(constraint="uq_relationship")
+        )
+        return result.rowcount
@@ -0,0 +1,92 @@
+"""Branch collapsing for large trees.
+
+A collapsed person stays visible while everything below them (their
+descendants, plus parentless in-laws married only into the hidden part) is
+replaced by one placeholder carrying the number of persons it stands for.
+With a ``max_nodes`` budget the cut is chosen automatically: whole
+generations are shown top-down for as long as persons plus placeholders fit.
+"""
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.models.relationship import RelationshipType
+from app.services.graph_index import TreeGraph
+
+
+@dataclass(slots=True)
+class CollapsedView:
+    visible: np.ndarray
+    # collapsed node -> number of hidden persons its placeholder stands for
+    placeholders: dict[int, int]
+
+
+def budget_cut(graph: TreeGraph, layer: np.ndarray, max_nodes: int) -> set[int]:
+    """Persons to collapse so that at most ``max_nodes`` nodes are returned.
+
+    The first generation is always shown, even if it alone exceeds the budget.
+    """
+    src, dst = graph.edge_arrays(RelationshipType.parent)
+    if layer.size == 0 or src.size == 0:
+        return set()
+
+    per_layer = np.bincount(layer)
+    shown = np.cumsum(per_layer)
+    cutoff = 0
+    for candidate in range(per_layer.size):
+        crossing = (layer[src] <= candidate) & (layer[dst] > candidate)
+        if shown[candidate] + np.unique(src[crossing]).size > max_nodes and candidate > 0:
+            break
+        cutoff = candidate
+
+    crossing = (layer[src] <= cutoff) & (layer[dst] > cutoff)
+    return set(np.unique(src[crossing]).tolist())
+
+
+def collapse(graph: TreeGraph, collapsed: Iterable[int]) -> CollapsedView:
+    """Hide everything below ``collapsed`` nodes.
+
+    A level-by-level BFS from the collapsed nodes marks descendants hidden
+    (a collapsed node below another one folds into it) and assigns each
+    hidden person to the first branch reaching it, so shared descendants
+    (children of two collapsed spouses) are counted by one placeholder only.
+    """
+    node_count = graph.node_count
+    sources = np.unique(np.fromiter(collapsed, dtype=np.int64))
+    hidden = np.zeros(node_count, dtype=bool)
+    owner = np.full(node_count, -1, dtype=np.int64)
+    owner[sources] = sources
+
+    frontier = sources
+    while frontier.size:
+        tails, heads = graph.gather(frontier, RelationshipType.parent)
+        fresh = ~hidden[heads]
+        tails, heads = tails[fresh], heads[fresh]
+        heads, first = np.unique(heads, return_index=True)
+        hidden[heads] = True
+        owner[heads] = owner[tails[first]]
+        frontier = heads
+
+    # A collapsed node hidden under another branch hands its people over
+    # (pointer jumping; bounded in case cyclic data chains owners in a loop).
+    for _ in range(64):
+        inherited = np.where(owner >= 0, owner[np.maximum(owner, 0)], owner)
+        if np.array_equal(inherited, owner):
+            break
+        owner = inherited
+
+    # In-laws without parents of their own only hang off their spouses.
+    spouse_a, spouse_b = graph.edge_arrays(RelationshipType.spouse)
+    if spouse_a.size:
+        has_parent = graph.indptr[RelationshipType.child][1:] > graph.indptr[RelationshipType.child][:-1]
+        visible_partners = np.bincount(spouse_b[~hidden[spouse_a]], minlength=node_count)
+        orphaned = hidden[spouse_a] & ~hidden[spouse_b] & ~has_parent[spouse_b]
+        orphaned &= visible_partners[spouse_b] == 0
+        hidden[spouse_b[orphaned]] = True
+        owner[spouse_b[orphaned]] = owner[spouse_a[orphaned]]
+
+    roots = sources[~hidden[sources]]
+    counts = np.bincount(owner[hidden], minlength=node_count)
+    placeholders = {int(node): int(counts[node]) for node in roots if counts[node] > 0}
+    return CollapsedView(visible=np.flatnonzero(~hidden), placeholders=placeholders)
@@ -0,0 +1,358 @@
+"""Duplicate-person detection and merging.
+
+Candidates come from blocking: every person is filed under a few cheap keys
+(normalized surname plus first initial; phonetic surname and first name per
+overlapping five-year birth window) and only persons sharing a key are
+compared, so the work grows with block sizes rather than with the square of
+the tree. Oversized blocks (very common names) are skipped for that key.
+Pairs are scored on names, patronymic, dates and places; fields missing on
+either side do not count for or against a match.
+"""
+import asyncio
+import unicodedata
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import combinations
+
+from sqlalchemy import and_, delete, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.media import PersonDocument, PersonPhoto
+from app.models.person import Person
+from app.models.proposal import EditProposal
+from app.models.relationship import Relationship
+from app.models.section import PersonSection
+from app.models.user import User
+from app.services.ancestry import add_parent_edge, is_ancestor, parent_edge
+
+MAX_BLOCK_SIZE = 200
+BIRTH_YEAR_BUCKET = 5
+
+# Field weights; each is only counted when both persons have the field.
+WEIGHTS = {
+    "first_name": 0.3,
+    "last_name": 0.3,
+    "patronymic": 0.1,
+    "birth_date": 0.3,
+    "death_date": 0.1,
+    "birth_place": 0.1,
+}
+
+MERGE_FIELDS = [
+    "patronymic",
+    "maiden_name",
+    "gender",
+    "birth_date",
+    "birth_place",
+    "death_date",
+    "death_place",
+    "burial_place",
+    "residence",
+    "avatar_url",
+    "avatar_thumb_url",
+]
+
+CYRILLIC = dict(
+    zip(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюяіїєґ",
+        [
+            "a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "i", "k", "l", "m", "n", "o", "p",
+            "r", "s", "t", "u", "f", "kh", "ts", "ch", "sh", "shch", "", "y", "", "e", "yu", "ya",
+            "i", "i", "e", "g",
+        ],
+    )
+)
+SOUNDEX = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def normalize(value: str | None) -> str:
+    """Lower-case ASCII letters only: accents dropped, Cyrillic transliterated."""
+    if not value:
+        return ""
+    text = "".join(CYRILLIC.get(ch, ch) for ch in value.lower())
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if "a" <= ch <= "z")
+
+
+def phonetic(value: str | None) -> str:
+    """American Soundex of the normalized value ("" when empty)."""
+    name = normalize(value)
+    if not name:
+        return ""
+    code = [name[0].upper()]
+    previous = SOUNDEX.get(name[0], "")
+    for ch in name[1:]:
+        digit = SOUNDEX.get(ch, "")
+        if digit and digit != previous:
+            code.append(digit)
+            if len(code) == 4:
+                break
+        if ch not in "hw":
+            previous = digit
+    return "".join(code).ljust(4, "0")
+
+
+@dataclass(slots=True)
+class _Profile:
+    id: uuid.UUID
+    first: str
+    surnames: tuple[str, ...]
+    patronymic: str
+    gender: object
+    birth_date: date | None
+    death_date: date | None
+    birth_place: str
+
+    @property
+    def birth_year(self) -> int | None:
+        return self.birth_date.year if self.birth_date else None
+
+
+def _profile(row) -> _Profile:
+    surnames = tuple(dict.fromkeys(s for s in (normalize(row.last_name), normalize(row.maiden_name)) if s))
+    return _Profile(
+        id=row.id,
+        first=normalize(row.first_name),
+        surnames=surnames,
+        patronymic=normalize(row.patronymic),
+        gender=row.gender,
+        birth_date=row.birth_date,
+        death_date=row.death_date,
+        birth_place=normalize(row.birth_place),
+    )
+
+
+def blocking_keys(person: _Profile) -> set[tuple]:
+    keys = set()
+    first_phonetic = phonetic(person.first)
+    year = person.birth_year
+    buckets = (
+        {year // BIRTH_YEAR_BUCKET, (year + BIRTH_YEAR_BUCKET // 2) // BIRTH_YEAR_BUCKET}
+        if year is not None
+        else {None}
+    )
+    for surname in person.surnames:
+        keys.add(("name", surname, person.first[:1]))
+        for bucket in buckets:
+            keys.add(("sound", phonetic(surname), first_phonetic, bucket))
+    return keys
+
+
+def _name_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if phonetic(a) == phonetic(b):
+        return 0.8
+    if a[:1] == b[:1] and (a.startswith(b) or b.startswith(a)):
+        return 0.6
+    return 0.0
+
+
+def _date_similarity(a: date, b: date) -> float:
+    if a == b:
+        return 1.0
+    gap = abs(a.year - b.year)
+    if gap == 0:
+        return 0.8
+    if gap <= 2:
+        return 0.4
+    return 0.0
+
+
+def score(a: _Profile, b: _Profile) -> float:
+    if a.gender is not None and b.gender is not None and a.gender != b.gender:
+        return 0.0
+
+    parts: list[tuple[float, float]] = []
+    if a.first and b.first:
+        parts.append((WEIGHTS["first_name"], _name_similarity(a.first, b.first)))
+    if a.surnames and b.surnames:
+        best = max(_name_similarity(x, y) for x in a.surnames for y in b.surnames)
+        parts.append((WEIGHTS["last_name"], best))
+    if a.patronymic and b.patronymic:
+        parts.append((WEIGHTS["patronymic"], _name_similarity(a.patronymic, b.patronymic)))
+    if a.birth_date and b.birth_date:
+        parts.append((WEIGHTS["birth_date"], _date_similarity(a.birth_date, b.birth_date)))
+    if a.death_date and b.death_date:
+        parts.append((WEIGHTS["death_date"], _date_similarity(a.death_date, b.death_date)))
+    if a.birth_place and b.birth_place:
+        parts.append((WEIGHTS["birth_place"], float(a.birth_place == b.birth_place)))
+
+    total = sum(weight for weight, _ in parts)
+    if total < WEIGHTS["first_name"] + WEIGHTS["last_name"]:
+        return 0.0
+    return sum(weight * value for weight, value in parts) / total
+
+
+def candidate_pairs(profiles: list[_Profile]) -> set[tuple[int, int]]:
+    blocks: dict[tuple, list[int]] = defaultdict(list)
+    for i, person in enumerate(profiles):
+        for key in blocking_keys(person):
+            blocks[key].append(i)
+
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= MAX_BLOCK_SIZE:
+            pairs.update(combinations(members, 2))
+    return pairs
+
+
+async def find_duplicates(
+    db: AsyncSession, tree_id: uuid.UUID, min_score: float, limit: int
+) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+    """``(person_id, other_id, score)`` for the best-scoring pairs in a tree."""
+    result = await db.execute(
+        select(
+            Person.id,
+            Person.first_name,
+            Person.last_name,
+            Person.maiden_name,
+            Person.patronymic,
+            Person.gender,
+            Person.birth_date,
+            Person.death_date,
+            Person.birth_place,
+        ).where(Person.tree_id == tree_id)
+    )
+    rows = result.all()
+    # Blocking and scoring are pure CPU work; keep them off the event loop.
+    return await asyncio.to_thread(_best_pairs, rows, min_score, limit)
+
+
+def _best_pairs(rows, min_score: float, limit: int) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+    profiles = [_profile(row) for row in rows]
+    scored = []
+    for i, j in candidate_pairs(profiles):
+        value = score(profiles[i], profiles[j])
+        if value >= min_score:
+            scored.append((profiles[i].id, profiles[j].id, round(value, 3)))
+    scored.sort(key=lambda pair: -pair[2])
+    return scored[:limit]
+
+
+class MergeConflict(Exception):
+    pass
+
+
+def _relationship_columns():
+    return (
+        Relationship.id,
+        Relationship.person_id,
+        Relationship.related_person_id,
+        Relationship.relationship_type,
+    )
+
+
+async def merge_persons(db: AsyncSession, survivor: Person, duplicate: Person) -> tuple[list, list]:
+    """Fold ``duplicate`` into ``survivor`` and delete it.
+
+    Relationships, photos, documents, sections, edit proposals and a linked
+    user account move to the survivor; empty survivor fields are filled from
+    the duplicate. Relationship rows that would repeat one the survivor
+    already has are dropped. Returns ``(repointed, removed)`` relationship
+    rows for the change log.
+    """
+    if await is_ancestor(db, survivor.id, duplicate.id) or await is_ancestor(
+        db, duplicate.id, survivor.id
+    ):
+        raise MergeConflict("Persons are ancestor and descendant of each other")
+
+    for field in MERGE_FIELDS:
+        if getattr(survivor, field) is None and getattr(duplicate, field) is not None:
+            setattr(survivor, field, getattr(duplicate, field))
+    survivor.updated_at = datetime.utcnow()
+
+    survivor_id, duplicate_id = survivor.id, duplicate.id
+    kept = aliased(Relationship)
+    already_outgoing = exists().where(
+        kept.person_id == survivor_id,
+        kept.related_person_id == Relationship.related_person_id,
+        kept.relationship_type == Relationship.relationship_type,
+    )
+    already_incoming = exists().where(
+        kept.related_person_id == survivor_id,
+        kept.person_id == Relationship.person_id,
+        kept.relationship_type == Relationship.relationship_type,
+    )
+    removed = (
+        await db.execute(
+            delete(Relationship)
+            .where(
+                or_(
+                    and_(Relationship.person_id == duplicate_id, Relationship.related_person_id == survivor_id),
+                    and_(Relationship.person_id == survivor_id, Relationship.related_person_id == duplicate_id),
+                    and_(Relationship.person_id == duplicate_id, already_outgoing),
+                    and_(Relationship.related_person_id == duplicate_id, already_incoming),
+                )
+            )
+            .returning(*_relationship_columns())
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+
+    repointed = [
+        *(
+            await db.execute(
+                update(Relationship)
+                .where(Relationship.person_id == duplicate_id)
+                .values(person_id=survivor_id)
+                .returning(*_relationship_columns())
+                .execution_options(synchronize_session=False)
+            )
+        ).all(),
+        *(
+            await db.execute(
+                update(Relationship)
+                .where(Relationship.related_person_id == duplicate_id)
+                .values(related_person_id=survivor_id)
+                .returning(*_relationship_columns())
+                .execution_options(synchronize_session=False)
+            )
+        ).all(),
+    ]
+
+    for model, column in (
+        (PersonPhoto, PersonPhoto.person_id),
+        (PersonDocument, PersonDocument.person_id),
+        (PersonSection, PersonSection.person_id),
+        (EditProposal, EditProposal.target_person_id),
+    ):
+        await db.execute(
+            update(model)
+            .where(column == duplicate_id)
+            .values({column.key: survivor_id})
+            .execution_options(synchronize_session=False)
+        )
+    linked = aliased(User)
+    await db.execute(
+        update(User)
+        .where(User.person_id == duplicate_id, ~exists().where(linked.person_id == survivor_id))
+        .values(person_id=survivor_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    await db.flush()
+    await db.execute(
+        delete(Person).where(Person.id == duplicate_id).execution_options(synchronize_session=False)
+    )
+    db.expunge(duplicate)
+
+    for edge in _parent_edges(repointed):
+        await add_parent_edge(db, survivor.tree_id, *edge)
+    return repointed, removed
+
+
+def _parent_edges(rows: Iterable) -> set[tuple[uuid.UUID, uuid.UUID]]:
+    edges = (parent_edge(r.relationship_type, r.person_id, r.related_person_id) for r in rows)
+    return {edge for edge in edges if edge is not None}
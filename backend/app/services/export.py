@@ -0,0 +1,247 @@
+"""Streaming tree export as JSON lines or GEDCOM.
+
+Both formats read through server-side cursors in their own REPEATABLE READ
+session and emit each record as soon as it is read, buffering only up to
+``EXPORT_CHUNK_BYTES`` before yielding, so memory does not grow with the tree.
+
+JSON lines is the lossless format: one ``{"<kind>": {...}}`` object per
+tree, person, relationship row, section, photo and document. GEDCOM numbers
+persons and families in SQL, so ``@I<n>@``/``@F<n>@`` pointers need no
+id map on the Python side.
+"""
+import uuid
+from collections.abc import AsyncIterator, Iterable
+
+from sqlalchemy import cast, func, literal, null, select, union, union_all
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by, array
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.database import AsyncSessionLocal
+from app.models.media import PersonDocument, PersonPhoto
+from app.models.person import Person
+from app.models.relationship import Relationship, RelationshipType
+from app.models.section import PersonSection
+from app.models.tree import Tree
+from app.schemas.media import DocumentOut, PhotoOut
+from app.schemas.person import PersonOut
+from app.schemas.relationship import RelationshipOut
+from app.schemas.section import SectionOut
+from app.schemas.tree import TreeOut
+from app.services.ancestry import tree_parent_edges
+from app.services.gedcom import family_lines, header_lines, person_lines
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+class _Chunks:
+    """Accumulates encoded records and hands them out in ~64 KiB chunks."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def add(self, data: bytes) -> bytes | None:
+        self.buffer += data
+        if len(self.buffer) < EXPORT_CHUNK_BYTES:
+            return None
+        return self.take()
+
+    def take(self) -> bytes:
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+
+def _json_line(kind: str, model) -> bytes:
+    return b'{"' + kind.encode() + b'":' + model.model_dump_json().encode() + b"}\n"
+
+
+async def export_jsonl(tree_id: uuid.UUID) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        chunks = _Chunks()
+
+        tree = await db.get(Tree, tree_id)
+        if tree is None:
+            return
+        chunks.add(_json_line("tree", TreeOut.model_validate(tree)))
+
+        passes = [
+            ("person", PersonOut, select(Person).where(Person.tree_id == tree_id)),
+            (
+                "relationship",
+                RelationshipOut,
+                select(Relationship).where(Relationship.tree_id == tree_id),
+            ),
+            *(
+                (
+                    kind,
+                    schema,
+                    select(model)
+                    .join(Person, Person.id == model.person_id)
+                    .where(Person.tree_id == tree_id),
+                )
+                for kind, schema, model in (
+                    ("section", SectionOut, PersonSection),
+                    ("photo", PhotoOut, PersonPhoto),
+                    ("document", DocumentOut, PersonDocument),
+                )
+            ),
+        ]
+        for kind, schema, stmt in passes:
+            rows = await db.stream_scalars(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for row in rows:
+                chunk = chunks.add(_json_line(kind, schema.model_validate(row)))
+                if chunk:
+                    db.expunge_all()
+                    yield chunk
+
+        if chunks.buffer:
+            yield chunks.take()
+
+
+def _json_list(fields: dict, order_by, where):
+    pairs = [part for name, column in fields.items() for part in (name, column)]
+    return (
+        select(func.json_agg(aggregate_order_by(func.json_build_object(*pairs), order_by), type_=JSON))
+        .where(where)
+        .scalar_subquery()
+    )
+
+
+def _person_attachments():
+    """Correlated JSON arrays of a person's sections, photos and documents."""
+    sections = _json_list(
+        {"title": PersonSection.title, "content_html": PersonSection.content_html},
+        PersonSection.sort_order,
+        PersonSection.person_id == Person.id,
+    )
+    photos = _json_list(
+        {"file_url": PersonPhoto.file_url, "title": PersonPhoto.caption},
+        PersonPhoto.sort_order,
+        PersonPhoto.person_id == Person.id,
+    )
+    documents = _json_list(
+        {
+            "file_url": PersonDocument.file_url,
+            "title": PersonDocument.file_name,
+            "file_type": PersonDocument.file_type,
+        },
+        PersonDocument.uploaded_at,
+        PersonDocument.person_id == Person.id,
+    )
+    return sections, photos, documents
+
+
+def _family_members(tree_id: uuid.UUID):
+    """``(family, role, person_no, gender)`` rows, parents (role 0) before children.
+
+    A family is a set of parents: everyone sharing exactly those parents is
+    one of its children, and spouse pairs without children form their own.
+    """
+    edges = tree_parent_edges(tree_id)
+    by_child = (
+        select(
+            edges.c.child_id,
+            func.array_agg(aggregate_order_by(edges.c.parent_id, edges.c.parent_id)).label("parents"),
+        )
+        .group_by(edges.c.child_id)
+        .subquery("by_child")
+    )
+    couples = select(
+        array(
+            [
+                func.least(Relationship.person_id, Relationship.related_person_id),
+                func.greatest(Relationship.person_id, Relationship.related_person_id),
+            ]
+        ).label("parents"),
+        cast(null(), PG_UUID(as_uuid=True)).label("child_id"),
+    ).where(
+        Relationship.tree_id == tree_id,
+        Relationship.relationship_type == RelationshipType.spouse,
+        Relationship.person_id != Relationship.related_person_id,
+    )
+    units = union(select(by_child.c.parents, by_child.c.child_id), couples).subquery("units")
+    families = (
+        select(
+            func.row_number().over(order_by=units.c.parents).label("family"),
+            units.c.parents,
+            func.array_remove(func.array_agg(units.c.child_id), null()).label("children"),
+        )
+        .group_by(units.c.parents)
+        .cte("families")
+    )
+    members = union_all(
+        select(
+            families.c.family,
+            literal(0).label("role"),
+            func.unnest(families.c.parents).label("person_id"),
+        ),
+        select(families.c.family, literal(1), func.unnest(families.c.children)),
+    ).subquery("members")
+    numbered = (
+        select(
+            Person.id,
+            Person.gender,
+            func.row_number().over(order_by=Person.id).label("number"),
+        )
+        .where(Person.tree_id == tree_id)
+        .subquery("numbered")
+    )
+    return (
+        select(members.c.family, members.c.role, numbered.c.number, numbered.c.gender)
+        .join(numbered, numbered.c.id == members.c.person_id)
+        .order_by(members.c.family, members.c.role, numbered.c.number)
+    )
+
+
+def _encode(lines: Iterable[str]) -> bytes:
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def export_gedcom(tree_id: uuid.UUID) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        chunks = _Chunks()
+
+        tree = await db.get(Tree, tree_id)
+        if tree is None:
+            return
+        chunks.add(_encode(header_lines(tree.name)))
+
+        persons = await db.stream(
+            select(Person, *_person_attachments())
+            .where(Person.tree_id == tree_id)
+            .order_by(Person.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        number = 0
+        async for person, sections, photos, documents in persons:
+            number += 1
+            media = [*(photos or []), *(documents or [])]
+            lines = person_lines(f"@I{number}@", person, sections or [], media)
+            chunk = chunks.add(_encode(lines))
+            if chunk:
+                db.expunge_all()
+                yield chunk
+
+        members = await db.stream(
+            _family_members(tree_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        family, parents, children = None, [], []
+        async for row in members:
+            if row.family != family and family is not None:
+                chunk = chunks.add(_encode(family_lines(f"@F{family}@", parents, children)))
+                if chunk:
+                    yield chunk
+                parents, children = [], []
+            family = row.family
+            if row.role == 0:
+                parents.append((f"@I{row.number}@", row.gender))
+            else:
+                children.append(f"@I{row.number}@")
+        if family is not None:
+            chunks.add(_encode(family_lines(f"@F{family}@", parents, children)))
+
+        chunks.add(b"0 TRLR\n")
+        yield chunks.take()
@@ -0,0 +1,369 @@
+"""Streaming GEDCOM 5.5.1 import and record writers for export.
+
+The file is read line by line and grouped into one level-0 record at a time,
+so memory holds the current batch of records plus the xref → id map, never
+the whole document. ``INDI`` records become persons; ``FAM`` records become
+spouse pairs and parent/child pairs (each with its inverse row). Persons are
+COPYed straight into ``persons``; relationship rows go through a staging
+table because families may reference individuals defined later in the file.
+
+Only exact dates (``12 MAR 1900``) are kept, since partial or approximate
+GEDCOM dates have no faithful ``date`` equivalent. Text is read as UTF-8;
+ANSEL-encoded files need converting first.
+
+The writers at the bottom render one record at a time for the export stream.
+"""
+import asyncio
+import io
+import re
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import BinaryIO
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.person import Gender
+from app.models.relationship import RelationshipType
+from app.services.ancestry import rebuild_tree_closure
+from app.services.bulk import RelationshipStaging, copy_persons
+from app.services.tree_changes import record_reload
+
+logger = structlog.get_logger()
+
+IMPORT_BATCH_RECORDS = 5000
+
+LINE_RE = re.compile(r"^\s*(\d+)\s+(?:(@[^@]+@)\s+)?(\S+)(?: (.*))?$")
+DATE_RE = re.compile(r"^(\d{1,2}) ([A-Z]{3}) (\d{3,4})$")
+NAME_RE = re.compile(r"^(?P<given>[^/]*)(?:/(?P<surname>[^/]*)/?)?(?P<suffix>.*)$")
+MONTH_NAMES = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+MONTHS = {month: number for number, month in enumerate(MONTH_NAMES, start=1)}
+SEX = {"M": Gender.male, "F": Gender.female}
+SEX_CODES = {gender: code for code, gender in SEX.items()}
+
+# Values longer than this are split with CONC (5.5.1 caps lines at 255 chars).
+MAX_VALUE_CHARS = 200
+
+
+@dataclass(slots=True)
+class GedcomNode:
+    tag: str
+    value: str = ""
+    xref: str | None = None
+    children: list["GedcomNode"] = field(default_factory=list)
+
+    def first(self, tag: str) -> "GedcomNode | None":
+        for child in self.children:
+            if child.tag == tag:
+                return child
+        return None
+
+    def all(self, tag: str) -> list["GedcomNode"]:
+        return [child for child in self.children if child.tag == tag]
+
+    def text(self, *path: str) -> str | None:
+        node = self
+        for tag in path:
+            node = node.first(tag)
+            if node is None:
+                return None
+        return node.value.strip() or None
+
+
+@dataclass(slots=True)
+class ImportResult:
+    persons: int = 0
+    relationships: int = 0
+
+
+def iter_lines(lines: Iterable[str]) -> Iterator[tuple[int, str | None, str, str]]:
+    """``(level, xref, tag, value)`` per well-formed line; others are skipped."""
+    for line in lines:
+        match = LINE_RE.match(line.rstrip("\r\n"))
+        if match:
+            level, xref, tag, value = match.groups()
+            yield int(level), xref, tag, value or ""
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[GedcomNode]:
+    """Level-0 records with their substructures, one at a time.
+
+    ``CONC``/``CONT`` continuations are folded into their parent's value.
+    """
+    stack: list[GedcomNode] = []
+    for level, xref, tag, value in iter_lines(lines):
+        if level == 0:
+            if stack:
+                yield stack[0]
+            stack = [GedcomNode(tag, value, xref)]
+            continue
+        if not stack or level > len(stack):
+            continue
+        del stack[level:]
+        parent = stack[-1]
+        if tag == "CONC":
+            parent.value += value
+        elif tag == "CONT":
+            parent.value += "\n" + value
+        else:
+            node = GedcomNode(tag, value, xref)
+            parent.children.append(node)
+            stack.append(node)
+    if stack:
+        yield stack[0]
+
+
+def parse_date(value: str | None) -> date | None:
+    match = DATE_RE.match(value.strip().upper()) if value else None
+    if not match or match.group(2) not in MONTHS:
+        return None
+    try:
+        return date(int(match.group(3)), MONTHS[match.group(2)], int(match.group(1)))
+    except ValueError:
+        return None
+
+
+def _name_parts(name: GedcomNode) -> tuple[str, str]:
+    match = NAME_RE.match(name.value.strip())
+    given = name.text("GIVN") or " ".join(match.group("given").split())
+    surname = name.text("SURN") or " ".join((match.group("surname") or "").split())
+    return given, surname
+
+
+def _fields(node: GedcomNode) -> dict[str, GedcomNode]:
+    """First child per tag, so a record's lookups scan its children once."""
+    fields: dict[str, GedcomNode] = {}
+    for child in node.children:
+        fields.setdefault(child.tag, child)
+    return fields
+
+
+def _event_text(fields: dict[str, GedcomNode], event: str, *tags: str) -> str | None:
+    node = fields.get(event)
+    if node is None:
+        return None
+    for tag in tags:
+        value = node.text(tag)
+        if value:
+            return value
+    return None
+
+
+def person_row(record: GedcomNode) -> dict:
+    """Map an ``INDI`` record onto ``PERSON_FIELDS``."""
+    fields = _fields(record)
+    names = record.all("NAME")
+    first_name = last_name = ""
+    maiden_name = None
+    if names:
+        first_name, last_name = _name_parts(names[0])
+        by_type = {(name.text("TYPE") or "").lower(): name for name in names[1:]}
+        if "married" in by_type:
+            maiden_name = last_name or None
+            last_name = _name_parts(by_type["married"])[1] or last_name
+        elif "maiden" in by_type or "birth" in by_type:
+            maiden_name = _name_parts(by_type.get("maiden") or by_type["birth"])[1] or None
+
+    sex = fields["SEX"].value.strip()[:1].upper() if "SEX" in fields else ""
+    patronymic = _event_text(fields, "NAME", "_PATR") or record.text("_PATR")
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "patronymic": patronymic,
+        "maiden_name": maiden_name,
+        "gender": SEX.get(sex),
+        "birth_date": parse_date(_event_text(fields, "BIRT", "DATE")),
+        "birth_place": _event_text(fields, "BIRT", "PLAC"),
+        "death_date": parse_date(_event_text(fields, "DEAT", "DATE")),
+        "death_place": _event_text(fields, "DEAT", "PLAC"),
+        "burial_place": _event_text(fields, "BURI", "PLAC"),
+        "residence": _event_text(fields, "RESI", "PLAC", "ADDR"),
+    }
+
+
+def family_edges(
+    record: GedcomNode, person_id
+) -> list[tuple[uuid.UUID, uuid.UUID, RelationshipType]]:
+    """Relationship rows (forward and inverse) implied by a ``FAM`` record."""
+    parents = [person_id(ref) for ref in (record.text("HUSB"), record.text("WIFE")) if ref]
+    children = [person_id(node.value.strip()) for node in record.all("CHIL") if node.value.strip()]
+
+    edges = []
+    if len(parents) == 2 and parents[0] != parents[1]:
+        edges.append((parents[0], parents[1], RelationshipType.spouse))
+        edges.append((parents[1], parents[0], RelationshipType.spouse))
+    for parent in parents:
+        for child in children:
+            if parent != child:
+                edges.append((parent, child, RelationshipType.parent))
+                edges.append((child, parent, RelationshipType.child))
+    return edges
+
+
+@dataclass(slots=True)
+class _Batch:
+    person_ids: list[uuid.UUID] = field(default_factory=list)
+    persons: list[dict] = field(default_factory=list)
+    edges: list[tuple[uuid.UUID, uuid.UUID, RelationshipType]] = field(default_factory=list)
+
+
+def _next_batch(records: Iterator[GedcomNode], ids: dict[str, uuid.UUID]) -> _Batch | None:
+    def person_id(xref: str) -> uuid.UUID:
+        if xref not in ids:
+            ids[xref] = uuid.uuid4()
+        return ids[xref]
+
+    chunk = list(islice(records, IMPORT_BATCH_RECORDS))
+    if not chunk:
+        return None
+    batch = _Batch()
+    for record in chunk:
+        if record.tag == "INDI" and record.xref:
+            batch.person_ids.append(person_id(record.xref))
+            batch.persons.append(person_row(record))
+        elif record.tag == "FAM":
+            batch.edges.extend(family_edges(record, person_id))
+    return batch
+
+
+async def import_gedcom(db: AsyncSession, tree_id: uuid.UUID, stream: BinaryIO) -> ImportResult:
+    """Load a GEDCOM file into an existing tree within the session's transaction.
+
+    Parsing runs in a worker thread one batch at a time so the event loop
+    stays responsive while a large upload is processed.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    records = iter_records(text)
+    ids: dict[str, uuid.UUID] = {}
+    result = ImportResult()
+
+    staging = RelationshipStaging(db, "gedcom_relationships")
+    await staging.create()
+    try:
+        while (batch := await asyncio.to_thread(_next_batch, records, ids)) is not None:
+            await copy_persons(db, tree_id, batch.person_ids, batch.persons)
+            await staging.add(batch.edges)
+            result.persons += len(batch.persons)
+    finally:
+        # Leave the caller's stream open; only the text wrapper is discarded.
+        text.detach()
+
+    result.relationships = await staging.flush(tree_id)
+    closure_rows = await rebuild_tree_closure(db, tree_id)
+    await record_reload(db, tree_id)
+    logger.info(
+        "GEDCOM imported",
+        tree_id=str(tree_id),
+        persons=result.persons,
+        relationships=result.relationships,
+        closure_rows=closure_rows,
+    )
+    return result
+
+
+def _line(level: int, tag: str, value: str | None = None, xref: str | None = None) -> list[str]:
+    """One GEDCOM line, with CONT for newlines and CONC for long values."""
+    head = f"{level} {xref} {tag}" if xref else f"{level} {tag}"
+    if value is None or value == "":
+        return [head]
+
+    lines = []
+    for i, part in enumerate(value.replace("\r\n", "\n").split("\n")):
+        chunks = [part[j : j + MAX_VALUE_CHARS] for j in range(0, len(part), MAX_VALUE_CHARS)] or [""]
+        for k, chunk in enumerate(chunks):
+            if i == 0 and k == 0:
+                lines.append(f"{head} {chunk}".rstrip())
+            else:
+                lines.append(f"{level + 1} {'CONC' if k else 'CONT'} {chunk}".rstrip())
+    return lines
+
+
+def format_date(value: date | None) -> str | None:
+    if value is None:
+        return None
+    return f"{value.day} {MONTH_NAMES[value.month - 1]} {value.year}"
+
+
+def header_lines(source: str) -> list[str]:
+    return [
+        "0 HEAD",
+        *_line(1, "SOUR", source),
+        "1 GEDC",
+        "2 VERS 5.5.1",
+        "2 FORM LINEAGE-LINKED",
+        "1 CHAR UTF-8",
+    ]
+
+
+def _media_format(url: str, file_type: str | None = None) -> str:
+    tail = url.rsplit("/", 1)[-1]
+    if "." in tail:
+        return tail.rsplit(".", 1)[-1].lower()
+    if file_type:
+        return file_type.rsplit("/", 1)[-1].lower()
+    return "jpg"
+
+
+def person_lines(xref: str, person, sections: list[dict], media: list[dict]) -> list[str]:
+    """An ``INDI`` record. ``sections``/``media`` are dicts as stored in the database."""
+    lines = _line(0, "INDI", xref=xref)
+    lines += _line(1, "NAME", f"{person.first_name} /{person.last_name}/".strip())
+    lines += _line(2, "GIVN", person.first_name or None)
+    lines += _line(2, "SURN", person.last_name or None)
+    if person.patronymic:
+        lines += _line(2, "_PATR", person.patronymic)
+    if person.maiden_name and person.maiden_name != person.last_name:
+        lines += _line(1, "NAME", f"{person.first_name} /{person.maiden_name}/".strip())
+        lines += _line(2, "TYPE", "maiden")
+    if person.gender in SEX_CODES:
+        lines += _line(1, "SEX", SEX_CODES[person.gender])
+
+    for tag, when, where in (
+        ("BIRT", person.birth_date, person.birth_place),
+        ("DEAT", person.death_date, person.death_place),
+        ("BURI", None, person.burial_place),
+        ("RESI", None, person.residence),
+    ):
+        if when or where:
+            lines += _line(1, tag)
+            if when:
+                lines += _line(2, "DATE", format_date(when))
+            if where:
+                lines += _line(2, "PLAC", where)
+
+    for section in sections:
+        lines += _line(1, "NOTE", f"{section['title']}\n{section['content_html']}")
+    for item in media:
+        lines += _line(1, "OBJE")
+        lines += _line(2, "FILE", item["file_url"])
+        lines += _line(3, "FORM", _media_format(item["file_url"], item.get("file_type")))
+        if item.get("title"):
+            lines += _line(2, "TITL", item["title"])
+    return lines
+
+
+def family_lines(
+    xref: str, parents: list[tuple[str, Gender | None]], children: list[str]
+) -> list[str]:
+    """A ``FAM`` record. GEDCOM has one HUSB and one WIFE slot; extra parents are dropped."""
+    husband = next((ref for ref, gender in parents if gender == Gender.male), None)
+    wife = next((ref for ref, gender in parents if gender == Gender.female), None)
+    for ref, _ in parents:
+        if ref in (husband, wife):
+            continue
+        if husband is None:
+            husband = ref
+        elif wife is None:
+            wife = ref
+
+    lines = _line(0, "FAM", xref=xref)
+    if husband:
+        lines += _line(1, "HUSB", husband)
+    if wife:
+        lines += _line(1, "WIFE", wife)
+    for child in children:
+        lines += _line(1, "CHIL", child)
+    return lines
@@ -0,0 +1,309 @@
+"""Per-tree in-memory graph index.
+
+Each tree's relationships are held as integer-indexed CSR adjacency arrays,
+one per relationship type, following the storage direction of the
+``relationships`` table: ``neighbors(u, parent)`` are the persons ``u`` is a
+parent of (u's children), ``neighbors(u, child)`` are u's parents.
+
+Indexes are built once from the DB, tagged with the tree version they
+reflect, and kept in sync by ``record_changes``: edge additions/removals and
+new persons are applied in place after the writing transaction commits, while
+anything the index cannot replay (person removals, missed versions) drops it
+so the next reader rebuilds. The registry is an LRU bounded by memory.
+
+Each graph also carries per-person descendant/ancestor counts of distinct
+relatives (a relative reached along two lines is counted once). They come
+from ``ancestry_closure``: grouped counts when the graph is built and, on a
+parent edge change, the counts of the parent and its ancestors / the child
+and its descendants, read inside the writing transaction and applied with
+the rest of the change.
+"""
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import numpy as np
+import structlog
+from sqlalchemy import func, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import any_uuid, run_after_commit
+from app.models.ancestry import AncestryClosure
+from app.models.person import Person
+from app.models.relationship import Relationship, RelationshipType
+
+logger = structlog.get_logger()
+
+# Rough footprint of one person entry (UUID object, list slot, dict entry).
+PERSON_ENTRY_BYTES = 150
+
+
+class TreeGraph:
+    def __init__(
+        self,
+        tree_id: uuid.UUID,
+        version: int,
+        person_ids: list[uuid.UUID],
+        edges: Iterable[tuple[uuid.UUID, uuid.UUID, RelationshipType]],
+    ) -> None:
+        self.tree_id = tree_id
+        self.version = version
+        self.person_ids = list(person_ids)
+        self.index = {pid: i for i, pid in enumerate(self.person_ids)}
+
+        by_type: dict[RelationshipType, tuple[list[int], list[int]]] = {
+            kind: ([], []) for kind in RelationshipType
+        }
+        for person_id, related_id, kind in edges:
+            u = self.index.get(person_id)
+            v = self.index.get(related_id)
+            if u is not None and v is not None:
+                by_type[kind][0].append(u)
+                by_type[kind][1].append(v)
+
+        self.indptr: dict[RelationshipType, np.ndarray] = {}
+        self.indices: dict[RelationshipType, np.ndarray] = {}
+        for kind, (src, dst) in by_type.items():
+            src_arr = np.asarray(src, dtype=np.int32)
+            dst_arr = np.asarray(dst, dtype=np.int32)
+            order = np.lexsort((dst_arr, src_arr))
+            indptr = np.zeros(len(self.person_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src_arr, minlength=len(self.person_ids)), out=indptr[1:])
+            self.indptr[kind] = indptr
+            self.indices[kind] = dst_arr[order]
+
+        self.descendant_count = np.zeros(len(self.person_ids), dtype=np.int64)
+        self.ancestor_count = np.zeros(len(self.person_ids), dtype=np.int64)
+
+    def set_counts(
+        self,
+        descendants: Iterable[tuple[uuid.UUID, int]] = (),
+        ancestors: Iterable[tuple[uuid.UUID, int]] = (),
+    ) -> None:
+        """Store ``(person_id, count)`` pairs read from the ancestry closure."""
+        for counts, rows in ((self.descendant_count, descendants), (self.ancestor_count, ancestors)):
+            for person_id, count in rows:
+                node = self.index.get(person_id)
+                if node is not None:
+                    counts[node] = count
+
+    def counts(self, person_id: uuid.UUID) -> tuple[int, int]:
+        """``(descendant_count, ancestor_count)`` of a person, zeros if unknown."""
+        node = self.index.get(person_id)
+        if node is None:
+            return 0, 0
+        return int(self.descendant_count[node]), int(self.ancestor_count[node])
+
+    @property
+    def node_count(self) -> int:
+        return len(self.person_ids)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = sum(a.nbytes for a in self.indptr.values()) + sum(a.nbytes for a in self.indices.values())
+        arrays += self.descendant_count.nbytes + self.ancestor_count.nbytes
+        return arrays + self.node_count * PERSON_ENTRY_BYTES
+
+    def neighbors(self, node: int, kind: RelationshipType) -> np.ndarray:
+        indptr = self.indptr[kind]
+        return self.indices[kind][indptr[node] : indptr[node + 1]]
+
+    def gather(self, nodes: np.ndarray, kind: RelationshipType) -> tuple[np.ndarray, np.ndarray]:
+        """All ``kind`` rows leaving ``nodes`` as parallel (node, neighbour) index arrays."""
+        indptr = self.indptr[kind]
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        heads = self.indices[kind][np.repeat(starts, counts) + offsets].astype(np.int64)
+        return np.repeat(np.asarray(nodes, dtype=np.int64), counts), heads
+
+    def edge_arrays(self, kind: RelationshipType) -> tuple[np.ndarray, np.ndarray]:
+        """All ``kind`` rows as parallel (person, related_person) index arrays."""
+        indptr = self.indptr[kind]
+        src = np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(indptr))
+        return src, self.indices[kind].astype(np.int64)
+
+    def has_edge(self, u: int, v: int, kind: RelationshipType) -> bool:
+        row = self.neighbors(u, kind)
+        pos = np.searchsorted(row, v)
+        return bool(pos < row.size and row[pos] == v)
+
+    def add_persons(self, person_ids: Iterable[uuid.UUID]) -> None:
+        """Append edgeless nodes, growing every array once per batch."""
+        fresh = [pid for pid in dict.fromkeys(person_ids) if pid not in self.index]
+        if not fresh:
+            return
+        for pid in fresh:
+            self.index[pid] = len(self.person_ids)
+            self.person_ids.append(pid)
+        for kind, indptr in self.indptr.items():
+            self.indptr[kind] = np.concatenate((indptr, np.full(len(fresh), indptr[-1])))
+        padding = np.zeros(len(fresh), dtype=self.descendant_count.dtype)
+        self.descendant_count = np.concatenate((self.descendant_count, padding))
+        self.ancestor_count = np.concatenate((self.ancestor_count, padding))
+
+    def add_person(self, person_id: uuid.UUID) -> int:
+        self.add_persons([person_id])
+        return self.index[person_id]
+
+    def add_edge(self, person_id: uuid.UUID, related_id: uuid.UUID, kind: RelationshipType) -> None:
+        u, v = self.add_person(person_id), self.add_person(related_id)
+        if self.has_edge(u, v, kind):
+            return
+        indptr = self.indptr[kind]
+        row = self.neighbors(u, kind)
+        pos = int(indptr[u] + np.searchsorted(row, v))
+        self.indices[kind] = np.insert(self.indices[kind], pos, v)
+        indptr[u + 1 :] += 1
+
+    def remove_edge(self, person_id: uuid.UUID, related_id: uuid.UUID, kind: RelationshipType) -> None:
+        u, v = self.index.get(person_id), self.index.get(related_id)
+        if u is None or v is None or not self.has_edge(u, v, kind):
+            return
+        indptr = self.indptr[kind]
+        pos = int(indptr[u] + np.searchsorted(self.neighbors(u, kind), v))
+        self.indices[kind] = np.delete(self.indices[kind], pos)
+        indptr[u + 1 :] -= 1
+
+
+async def load_tree_graph(db: AsyncSession, tree_id: uuid.UUID, version: int) -> TreeGraph:
+    ids_result = await db.execute(select(Person.id).where(Person.tree_id == tree_id))
+    edges_result = await db.execute(
+        select(Relationship.person_id, Relationship.related_person_id, Relationship.relationship_type)
+        .where(Relationship.tree_id == tree_id)
+    )
+    graph = TreeGraph(tree_id, version, ids_result.scalars().all(), edges_result.tuples().all())
+
+    counts = {}
+    for column in (AncestryClosure.ancestor_id, AncestryClosure.descendant_id):
+        result = await db.execute(
+            select(column, func.count())
+            .where(AncestryClosure.tree_id == tree_id)
+            .group_by(column)
+        )
+        counts[column.key] = result.tuples().all()
+    graph.set_counts(descendants=counts["ancestor_id"], ancestors=counts["descendant_id"])
+    return graph
+
+
+async def _region_counts(db: AsyncSession, person_ids: list[uuid.UUID], upward: bool):
+    """``(person_id, count)`` for ``person_ids`` and their ancestors (``upward``) or descendants.
+
+    Upward, the count is each person's descendants; downward, their ancestors.
+    Those are exactly the counts a parent edge change at ``person_ids`` can move.
+    """
+    near, far = AncestryClosure.descendant_id, AncestryClosure.ancestor_id
+    if not upward:
+        near, far = far, near
+    region = union(
+        select(far.label("person_id")).where(near == any_uuid(person_ids)),
+        select(Person.id).where(Person.id == any_uuid(person_ids)),
+    ).subquery("region")
+    result = await db.execute(
+        select(region.c.person_id, func.count(near))
+        .outerjoin(AncestryClosure, far == region.c.person_id)
+        .group_by(region.c.person_id)
+    )
+    return result.tuples().all()
+
+
+class GraphIndex:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._graphs: OrderedDict[uuid.UUID, tuple[TreeGraph, int]] = OrderedDict()
+
+    async def get(self, db: AsyncSession, tree_id: uuid.UUID, version: int) -> TreeGraph:
+        entry = self._graphs.get(tree_id)
+        if entry is not None and entry[0].version == version:
+            self._graphs.move_to_end(tree_id)
+            return entry[0]
+
+        graph = await load_tree_graph(db, tree_id, version)
+        self._store(graph)
+        logger.debug(
+            "Graph index built",
+            tree_id=str(tree_id),
+            version=version,
+            persons=graph.node_count,
+            size=graph.nbytes,
+        )
+        return graph
+
+    def _store(self, graph: TreeGraph) -> None:
+        previous = self._graphs.pop(graph.tree_id, None)
+        if previous is not None:
+            self.total_bytes -= previous[1]
+        size = graph.nbytes
+        if size > self.max_bytes:
+            return
+        self._graphs[graph.tree_id] = (graph, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._graphs.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+    def invalidate(self, tree_id: uuid.UUID) -> None:
+        entry = self._graphs.pop(tree_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    async def schedule_update(
+        self,
+        db: AsyncSession,
+        tree_id: uuid.UUID,
+        version: int,
+        *,
+        persons: Iterable[uuid.UUID] = (),
+        relationships: Iterable = (),
+        removed_persons: Iterable[uuid.UUID] = (),
+        removed_relationships: Iterable = (),
+    ) -> None:
+        """Apply a write to the cached graph once ``db`` commits.
+
+        ``relationships``/``removed_relationships`` are rows or objects with
+        ``person_id``, ``related_person_id`` and ``relationship_type``. Call
+        after the ancestry closure has been updated in the same transaction.
+        """
+        persons = list(persons)
+        removed_persons = list(removed_persons)
+        added = [(r.person_id, r.related_person_id, r.relationship_type) for r in relationships]
+        removed = [
+            (r.person_id, r.related_person_id, r.relationship_type) for r in removed_relationships
+        ]
+
+        lineage = {
+            (a, b) if kind == RelationshipType.parent else (b, a)
+            for a, b, kind in (*removed, *added)
+            if kind in (RelationshipType.parent, RelationshipType.child)
+        }
+        descendants, ancestors = [], []
+        if lineage and tree_id in self._graphs and not removed_persons:
+            descendants = await _region_counts(db, list({p for p, _ in lineage}), upward=True)
+            ancestors = await _region_counts(db, list({c for _, c in lineage}), upward=False)
+
+        def apply() -> None:
+            entry = self._graphs.get(tree_id)
+            if entry is None:
+                return
+            graph = entry[0]
+            if removed_persons or graph.version != version - 1:
+                self.invalidate(tree_id)
+                return
+            graph.add_persons(persons)
+            for edge in removed:
+                graph.remove_edge(*edge)
+            for edge in added:
+                graph.add_edge(*edge)
+            graph.set_counts(descendants, ancestors)
+            graph.version = version
+            self._store(graph)
+
+        run_after_commit(db, apply)
+
+
+graph_index = GraphIndex(settings.GRAPH_INDEX_MAX_BYTES)
@@ -0,0 +1,175 @@
+"""Shortest relationship paths and kinship labels.
+
+Paths are found by bidirectional breadth-first search over a ``TreeGraph``,
+so a lookup touches only the neighbourhoods of the two persons and never the
+database. A step records what the next person on the path is to the previous
+one: ``parent`` means "the next person is the previous one's parent".
+"""
+from app.models.relationship import RelationshipType
+from app.services.graph_index import TreeGraph
+
+# A row (u, v, kind) says "u is v's <kind>". Walking it from u, v is u's:
+FORWARD_STEP = {
+    RelationshipType.parent: RelationshipType.child,
+    RelationshipType.child: RelationshipType.parent,
+    RelationshipType.spouse: RelationshipType.spouse,
+    RelationshipType.sibling: RelationshipType.sibling,
+}
+
+ORDINALS = ["", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth"]
+REMOVALS = {1: "once", 2: "twice", 3: "thrice"}
+
+
+def _expand(graph: TreeGraph, frontier: list[int], seen: dict, forward: bool) -> list[int]:
+    """Visit every unseen neighbour of ``frontier``; return the next frontier."""
+    next_frontier = []
+    for u in frontier:
+        depth = seen[u][2] + 1
+        for kind in RelationshipType:
+            # Forward: the neighbour is u's FORWARD_STEP[kind]. Backward: the
+            # row itself says what u is to the neighbour.
+            step = FORWARD_STEP[kind] if forward else kind
+            for v in graph.neighbors(u, kind).tolist():
+                if v not in seen:
+                    seen[v] = (u, step, depth)
+                    next_frontier.append(v)
+    return next_frontier
+
+
+def shortest_path(graph: TreeGraph, source: int, target: int) -> list[tuple[int, RelationshipType]] | None:
+    """Shortest chain of ``(node, step)`` from ``source`` (exclusive) to ``target``.
+
+    Always grows the smaller frontier by one full level, then picks the
+    meeting node with the lowest total depth. Returns ``None`` if the two
+    persons are not connected.
+    """
+    if source == target:
+        return []
+
+    forward: dict[int, tuple[int | None, RelationshipType | None, int]] = {source: (None, None, 0)}
+    backward: dict[int, tuple[int | None, RelationshipType | None, int]] = {target: (None, None, 0)}
+    forward_frontier, backward_frontier = [source], [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier = _expand(graph, forward_frontier, forward, forward=True)
+            reached = forward_frontier
+        else:
+            backward_frontier = _expand(graph, backward_frontier, backward, forward=False)
+            reached = backward_frontier
+
+        meets = [node for node in reached if node in forward and node in backward]
+        if meets:
+            meet = min(meets, key=lambda node: forward[node][2] + backward[node][2])
+            return _join(forward, backward, meet)
+    return None
+
+
+def _join(forward: dict, backward: dict, meet: int) -> list[tuple[int, RelationshipType]]:
+    head = []
+    node = meet
+    while forward[node][0] is not None:
+        prev, step, _ = forward[node]
+        head.append((node, step))
+        node = prev
+    head.reverse()
+
+    tail = []
+    node = meet
+    while backward[node][0] is not None:
+        nxt, step, _ = backward[node]
+        tail.append((nxt, step))
+        node = nxt
+    return head + tail
+
+
+def _numbered(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def _ordinal(n: int) -> str:
+    return ORDINALS[n] if n < len(ORDINALS) else _numbered(n)
+
+
+def _greats(count: int, base: str) -> str:
+    if count <= 0:
+        return base
+    if count == 1:
+        return f"great-{base}"
+    return f"{_numbered(count)} great-{base}"
+
+
+def blood_label(up: int, down: int) -> str:
+    """Name of someone ``up`` generations above a common ancestor path and ``down`` below it."""
+    if up == 0 and down == 0:
+        return "self"
+    if down == 0:
+        return "parent" if up == 1 else _greats(up - 2, "grandparent")
+    if up == 0:
+        return "child" if down == 1 else _greats(down - 2, "grandchild")
+    if up == 1 and down == 1:
+        return "sibling"
+    if down == 1:
+        return _greats(up - 2, "aunt/uncle")
+    if up == 1:
+        return "niece/nephew" if down == 2 else _greats(down - 3, "grandniece/nephew")
+
+    degree = min(up, down) - 1
+    removed = abs(up - down)
+    label = f"{_ordinal(degree)} cousin"
+    if removed:
+        label += f" {REMOVALS.get(removed, f'{removed} times')} removed"
+    return label
+
+
+def _blood_segment(moves: str) -> tuple[int, int] | None:
+    up = len(moves) - len(moves.lstrip("U"))
+    rest = moves[up:]
+    if rest.strip("D"):
+        return None
+    return up, len(rest)
+
+
+SPOUSE_OF_RELATIVE = {"child": "child-in-law", "sibling": "sibling-in-law", "parent": "step-parent"}
+RELATIVE_OF_SPOUSE = {"parent": "parent-in-law", "sibling": "sibling-in-law", "child": "stepchild"}
+
+
+def kinship_label(steps: list[RelationshipType]) -> str:
+    """What the last person on a path is to the first one."""
+    moves = "".join(
+        {
+            RelationshipType.parent: "U",
+            RelationshipType.child: "D",
+            RelationshipType.sibling: "X",
+            RelationshipType.spouse: "S",
+        }[step]
+        for step in steps
+    )
+    # A sibling stays one step until the end, so only a real child step
+    # followed by a parent step reads as the child's other parent (DU -> S).
+    # Siblings share parents: their parent is one's own, a child's sibling
+    # is one's own child, and a sibling's sibling is a sibling.
+    rewrites = (("XU", "U"), ("DX", "D"), ("XX", "X"), ("DU", "S"), ("SS", ""))
+    while any(pattern in moves for pattern, _ in rewrites):
+        for pattern, replacement in rewrites:
+            moves = moves.replace(pattern, replacement)
+    # What is left of a sibling is the up-and-down at the common ancestor.
+    moves = moves.replace("X", "UD")
+
+    segments = moves.split("S")
+    blood = [_blood_segment(segment) for segment in segments]
+    if any(b is None for b in blood) or len(segments) > 2:
+        return "relative by marriage"
+
+    if len(segments) == 1:
+        return blood_label(*blood[0])
+
+    before, after = blood_label(*blood[0]), blood_label(*blood[1])
+    if before == "self" and after == "self":
+        return "spouse"
+    if before == "self":
+        return RELATIVE_OF_SPOUSE.get(after, f"spouse's {after}")
+    if after == "self":
+        return SPOUSE_OF_RELATIVE.get(before, f"{before}'s spouse")
+    return "relative by marriage"
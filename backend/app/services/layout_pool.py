@@ -0,0 +1,212 @@
+"""Runs tree layouts in worker processes, off the event loop.
+
+Jobs receive only int32 index arrays and return float32 coordinates, so the
+pickling cost stays proportional to the graph, not to ORM objects. Small
+graphs are laid out inline, where a round trip would cost more than the
+work. Each worker is its own process with a private pipe and runs one job
+at a time, so a job that exceeds ``LAYOUT_TIMEOUT_SECONDS`` (or crashes its
+worker) only takes that process down: it is terminated and joined, and the
+request falls back to the cheap generation layout, computed in a thread.
+A layout keyed by tree that timed out is not retried in a worker for
+``LAYOUT_BACKOFF_SECONDS``: that tree gets the fallback straight away, so one
+oversized tree cannot keep the workers busy.
+"""
+import asyncio
+import multiprocessing
+import time
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.services.layout import cycle_members, generation_layout, layered_layout
+
+logger = structlog.get_logger()
+
+# How long a terminated worker gets to exit before it is killed outright.
+WORKER_KILL_GRACE_SECONDS = 1.0
+
+
+@dataclass(slots=True)
+class LayoutResult:
+    x: np.ndarray
+    y: np.ndarray
+    # Nodes on parent cycles (only computed when layering, not for fixed layers).
+    cycles: np.ndarray
+    fallback: bool = False
+
+
+def compute_layout(
+    node_count: int,
+    parent_src: np.ndarray,
+    parent_dst: np.ndarray,
+    spouse_a: np.ndarray,
+    spouse_b: np.ndarray,
+    layers: np.ndarray | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Worker job: full layered layout plus cycle detection."""
+    x, y = layered_layout(node_count, parent_src, parent_dst, spouse_a, spouse_b, layers=layers)
+    if layers is None:
+        cycles = cycle_members(node_count, parent_src, parent_dst)
+    else:
+        cycles = np.empty(0, dtype=np.int64)
+    return x.astype(np.float32), y.astype(np.float32), cycles.astype(np.int32)
+
+
+def _worker_main(conn) -> None:
+    """Worker process loop: answer each job received on ``conn``."""
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, compute_layout(*args)))
+        except Exception as exc:
+            conn.send((False, repr(exc)))
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class _Worker:
+    def __init__(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, args: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Send one job and wait for its result (blocking; call from a thread)."""
+        try:
+            self.conn.send(args)
+            ok, value = self.conn.recv()
+        except (EOFError, OSError) as exc:
+            raise WorkerCrashed(f"exit code {self.process.exitcode}") from exc
+        if not ok:
+            raise WorkerCrashed(value)
+        return value
+
+    def kill(self) -> None:
+        """Terminate the process and wait for it (blocking; call from a thread)."""
+        self.process.terminate()
+        self.process.join(WORKER_KILL_GRACE_SECONDS)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class LayoutPool:
+    def __init__(
+        self, workers: int, timeout: float, inline_max_nodes: int, backoff: float = 0.0
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.inline_max_nodes = inline_max_nodes
+        self.backoff = backoff
+        # key -> monotonic time until which its layouts skip the workers.
+        self._backed_off: dict[Hashable, float] = {}
+        self._idle: list[_Worker] = []
+        self._busy: set[_Worker] = set()
+        # Bounds running jobs (and so live processes): callers wait for a slot.
+        self._slots = asyncio.Semaphore(workers)
+
+    def shutdown(self) -> None:
+        for worker in [*self._idle, *self._busy]:
+            worker.kill()
+            worker.conn.close()
+        self._idle.clear()
+        self._busy.clear()
+
+    async def _run(self, args: tuple) -> LayoutResult:
+        worker = self._idle.pop() if self._idle else await asyncio.to_thread(_Worker)
+        self._busy.add(worker)
+        job = asyncio.ensure_future(asyncio.to_thread(worker.run, args))
+        try:
+            result = LayoutResult(*await asyncio.wait_for(asyncio.shield(job), self.timeout))
+        except BaseException:
+            self._busy.discard(worker)
+            # Killing the process ends the blocked recv in the job thread.
+            await asyncio.to_thread(worker.kill)
+            await asyncio.gather(job, return_exceptions=True)
+            worker.conn.close()
+            raise
+        self._busy.discard(worker)
+        self._idle.append(worker)
+        return result
+
+    async def layout(
+        self,
+        node_count: int,
+        parent_src: np.ndarray,
+        parent_dst: np.ndarray,
+        spouse_a: np.ndarray,
+        spouse_b: np.ndarray,
+        layers: np.ndarray | None = None,
+        key: Hashable | None = None,
+    ) -> LayoutResult:
+        """Lay out the graph; ``key`` (e.g. the tree id) enables the timeout backoff."""
+        args = (
+            node_count,
+            np.asarray(parent_src, dtype=np.int32),
+            np.asarray(parent_dst, dtype=np.int32),
+            np.asarray(spouse_a, dtype=np.int32),
+            np.asarray(spouse_b, dtype=np.int32),
+            None if layers is None else np.asarray(layers, dtype=np.int32),
+        )
+        if node_count <= self.inline_max_nodes:
+            return LayoutResult(*compute_layout(*args))
+        if key is not None and self._backed_off.get(key, 0.0) > time.monotonic():
+            return await self._fallback(args, "backing off after timeout")
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except TimeoutError:
+            return await self._fallback(args, "queue timeout")
+
+        try:
+            return await self._run(args)
+        except TimeoutError:
+            if key is not None:
+                self._back_off(key)
+            return await self._fallback(args, "job timeout")
+        except WorkerCrashed as exc:
+            return await self._fallback(args, f"worker crashed: {exc}")
+        finally:
+            self._slots.release()
+
+    def _back_off(self, key: Hashable) -> None:
+        now = time.monotonic()
+        for expired in [k for k, until in self._backed_off.items() if until <= now]:
+            del self._backed_off[expired]
+        self._backed_off[key] = now + self.backoff
+
+    async def _fallback(self, args: tuple, reason: str) -> LayoutResult:
+        node_count = args[0]
+        logger.warning("Layout fell back to generation rows", nodes=node_count, reason=reason)
+        return await asyncio.to_thread(_fallback_layout, *args)
+
+
+def _fallback_layout(
+    node_count: int,
+    parent_src: np.ndarray,
+    parent_dst: np.ndarray,
+    spouse_a: np.ndarray,
+    spouse_b: np.ndarray,
+    layers: np.ndarray | None,
+) -> LayoutResult:
+    x, y = generation_layout(node_count, parent_src, parent_dst, layers)
+    cycles = cycle_members(node_count, parent_src, parent_dst) if layers is None else np.empty(0)
+    return LayoutResult(x, y, cycles.astype(np.int32), fallback=True)
+
+
+layout_pool = LayoutPool(
+    settings.LAYOUT_WORKERS,
+    settings.LAYOUT_TIMEOUT_SECONDS,
+    settings.LAYOUT_INLINE_MAX_NODES,
+    settings.LAYOUT_BACKOFF_SECONDS,
+)
@@ -1,13 +1,18 @@
+import asyncio
 import io
 import uuid
+from collections.abc import Iterable
 from urllib.parse import urlparse
 
 import structlog
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.database import run_after_commit
 
 logger = structlog.get_logger()
 
@@ -127,18 +132,61 @@ async def upload_image_with_thumb(
     return full_url, thumb_url
 
 
+def object_name(url: str) -> str | None:
+    """Object key of a public URL built by ``_build_public_url``."""
+    parts = urlparse(url).path.lstrip("/").split("/", 1)
+    if len(parts) < 2:
+        return None
+    return parts[1]
+
+
 async def delete_file(url: str) -> bool:
     client = get_minio_client()
     try:
-        parsed = urlparse(url)
-        path = parsed.path.lstrip("/")
-        parts = path.split("/", 1)
-        if len(parts) < 2:
+        name = object_name(url)
+        if name is None:
             return False
-        object_name = parts[1]
 
-        client.remove_object(settings.STORAGE_BUCKET, object_name)
+        client.remove_object(settings.STORAGE_BUCKET, name)
         return True
     except S3Error as e:
         logger.error("Failed to delete file from MinIO", url=url, error=str(e))
         return False
+
+
+def _remove_objects(names: list[str]) -> int:
+    client = get_minio_client()
+    # remove_objects is lazy: errors only surface while iterating the result.
+    errors = list(client.remove_objects(settings.STORAGE_BUCKET, (DeleteObject(n) for n in names)))
+    for error in errors:
+        logger.error("Failed to delete file from MinIO", object=error.name, error=error.message)
+    return len(names) - len(errors)
+
+
+async def remove_files(urls: Iterable[str]) -> int:
+    """Delete many objects with bulk DeleteObjects requests; returns how many went."""
+    names = [name for name in map(object_name, urls) if name]
+    if not names:
+        return 0
+    try:
+        return await asyncio.to_thread(_remove_objects, names)
+    except S3Error as e:
+        logger.error("Bulk delete from MinIO failed", count=len(names), error=str(e))
+        return 0
+
+
+_removals: set[asyncio.Task] = set()
+
+
+def remove_files_after_commit(db: AsyncSession, urls: Iterable[str]) -> None:
+    """Queue ``remove_files`` as a background task once ``db`` commits."""
+    urls = [url for url in urls if url]
+    if not urls:
+        return
+
+    def start() -> None:
+        task = asyncio.get_running_loop().create_task(remove_files(urls))
+        _removals.add(task)
+        task.add_done_callback(_removals.discard)
+
+    run_after_commit(db, start)
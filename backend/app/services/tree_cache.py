@@ -0,0 +1,102 @@
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import structlog
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.tree import Tree
+
+logger = structlog.get_logger()
+
+
+async def bump_tree_version(db: AsyncSession, tree_id: uuid.UUID) -> int:
+    """Increment the tree's version so cached layouts for the old version stop matching."""
+    result = await db.execute(
+        update(Tree)
+        .where(Tree.id == tree_id)
+        .values(version=Tree.version + 1)
+        .returning(Tree.version)
+    )
+    return result.scalar_one()
+
+
+def tree_etag(tree_id: uuid.UUID, version: int, variant: str | None = None) -> str:
+    suffix = f"-{variant}" if variant else ""
+    return f'"{tree_id}-{version}{suffix}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Rough per-entry footprint of a positions dict item (UUID key plus {"x", "y"} dict).
+POSITION_ENTRY_BYTES = 400
+
+
+@dataclass(slots=True)
+class TreeSnapshot:
+    """Layout of one tree version plus its encoded payloads, keyed by representation."""
+
+    positions: dict[uuid.UUID, dict[str, float]]
+    cycles: list[uuid.UUID] = field(default_factory=list)
+    counts: dict[uuid.UUID, tuple[int, int]] = field(default_factory=dict)
+    bodies: dict[str, bytes] = field(default_factory=dict)
+    # Generation-row layout used after a layout timeout; served but never cached.
+    fallback: bool = False
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values()) + len(self.positions) * POSITION_ENTRY_BYTES
+
+
+class SnapshotCache:
+    """LRU cache of tree snapshots keyed by (tree_id, version), bounded by total bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[tuple[uuid.UUID, int], tuple[TreeSnapshot, int]] = OrderedDict()
+
+    def get(self, tree_id: uuid.UUID, version: int) -> TreeSnapshot | None:
+        key = (tree_id, version)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, tree_id: uuid.UUID, version: int, snapshot: TreeSnapshot) -> None:
+        """Insert or re-account a snapshot (call again after adding a body to it)."""
+        key = (tree_id, version)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= previous[1]
+
+        size = snapshot.size
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (snapshot, size)
+        self.total_bytes += size
+
+        while self.total_bytes > self.max_bytes:
+            (evicted_tree, evicted_version), (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            logger.debug(
+                "Tree snapshot evicted",
+                tree_id=str(evicted_tree),
+                version=evicted_version,
+                size=evicted_size,
+            )
+
+    def invalidate(self, tree_id: uuid.UUID) -> None:
+        for key in [k for k in self._entries if k[0] == tree_id]:
+            self.total_bytes -= self._entries.pop(key)[1]
+
+
+snapshot_cache = SnapshotCache(settings.LAYOUT_CACHE_MAX_BYTES)
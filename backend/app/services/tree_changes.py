@@ -0,0 +1,83 @@
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import run_after_commit
+from app.models.tree_change import ChangeEntity, ChangeOp, TreeChange
+from app.services.graph_index import graph_index
+from app.services.tree_cache import bump_tree_version
+
+
+async def record_changes(
+    db: AsyncSession,
+    tree_id: uuid.UUID,
+    *,
+    persons: Iterable[uuid.UUID] = (),
+    relationships: Iterable = (),
+    removed_persons: Iterable[uuid.UUID] = (),
+    removed_relationships: Iterable = (),
+) -> int:
+    """Bump the tree version and log which nodes and edges changed in it.
+
+    Relationships are passed as rows or objects carrying ``id``, ``person_id``,
+    ``related_person_id`` and ``relationship_type`` so the graph index can
+    replay them in place.
+    """
+    persons, removed_persons = list(persons), list(removed_persons)
+    relationships, removed_relationships = list(relationships), list(removed_relationships)
+    version = await bump_tree_version(db, tree_id)
+
+    entries = [
+        *((ChangeEntity.person, pid, ChangeOp.upsert) for pid in persons),
+        *((ChangeEntity.relationship, rel.id, ChangeOp.upsert) for rel in relationships),
+        *((ChangeEntity.person, pid, ChangeOp.delete) for pid in removed_persons),
+        *((ChangeEntity.relationship, rel.id, ChangeOp.delete) for rel in removed_relationships),
+    ]
+    if entries:
+        await db.execute(
+            insert(TreeChange),
+            [
+                {
+                    "tree_id": tree_id,
+                    "version": version,
+                    "entity_type": entity_type,
+                    "entity_id": entity_id,
+                    "op": op,
+                }
+                for entity_type, entity_id, op in entries
+            ],
+        )
+
+    await graph_index.schedule_update(
+        db,
+        tree_id,
+        version,
+        persons=persons,
+        relationships=relationships,
+        removed_persons=removed_persons,
+        removed_relationships=removed_relationships,
+    )
+    return version
+
+
+async def record_reload(db: AsyncSession, tree_id: uuid.UUID) -> int:
+    """Bump the tree version after a bulk rewrite without logging its entries.
+
+    A single ``reload`` marker is logged at the new version instead, which
+    makes clients behind it fall back to a full reload; the cached graph is
+    dropped instead of patched.
+    """
+    version = await bump_tree_version(db, tree_id)
+    await db.execute(
+        insert(TreeChange).values(
+            tree_id=tree_id,
+            version=version,
+            entity_type=ChangeEntity.tree,
+            entity_id=tree_id,
+            op=ChangeOp.reload,
+        )
+    )
+    run_after_commit(db, lambda: graph_index.invalidate(tree_id))
+    return version
@@ -0,0 +1,85 @@
+"""Columnar MessagePack encoding of tree payloads.
+
+The ReactFlow JSON repeats every key and spells each UUID out as a 36-char
+string for every node and edge. This format sends each column once instead:
+
+- ``person_ids``: 16-byte UUIDs concatenated in node order; edges refer to
+  persons by their position in this table;
+- ``x``/``y``: little-endian float32 arrays;
+- ``birth_date``: little-endian int32 days since 1970-01-01 (``DATE_NULL`` if unknown);
+- ``last_name``: uint32 indices into the interned ``last_names`` table;
+- ``descendant_count``/``ancestor_count``: little-endian uint32 arrays;
+- ``edge_ids``: 16-byte relationship UUIDs; ``edge_source``/``edge_target``:
+  uint32 person indices; ``edge_type``: uint8 indices into ``edge_types``;
+- ``cycle_person_ids``: 16-byte UUIDs of persons caught in a parent cycle.
+
+Binary columns map directly onto JS typed arrays on the client.
+"""
+from datetime import date
+
+import msgpack
+import numpy as np
+
+from app.models.relationship import RelationshipType
+
+PACKED_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+FORMAT = "roots-columnar/1"
+DATE_NULL = np.iinfo(np.int32).min
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EDGE_TYPES = [t.value for t in RelationshipType]
+
+
+def pack_tree(persons, edges, positions, cycles=(), counts=None) -> bytes:
+    """Encode persons (nodes) and already-deduplicated relationship rows (edges)."""
+    count = len(persons)
+    index = {p.id: i for i, p in enumerate(persons)}
+
+    x = np.zeros(count, dtype="<f4")
+    y = np.zeros(count, dtype="<f4")
+    birth = np.full(count, DATE_NULL, dtype="<i4")
+    last_name_idx = np.zeros(count, dtype="<u4")
+    last_names: dict[str, int] = {}
+    descendants = np.zeros(count, dtype="<u4")
+    ancestors = np.zeros(count, dtype="<u4")
+    counts = counts or {}
+
+    for i, p in enumerate(persons):
+        position = positions.get(p.id)
+        if position is not None:
+            x[i] = position["x"]
+            y[i] = position["y"]
+        if p.birth_date is not None:
+            birth[i] = p.birth_date.toordinal() - EPOCH_ORDINAL
+        last_name_idx[i] = last_names.setdefault(p.last_name, len(last_names))
+        descendants[i], ancestors[i] = counts.get(p.id, (0, 0))
+
+    kept = [rel for rel in edges if rel.person_id in index and rel.related_person_id in index]
+    type_index = {t: i for i, t in enumerate(EDGE_TYPES)}
+
+    payload = {
+        "format": FORMAT,
+        "person_ids": b"".join(p.id.bytes for p in persons),
+        "x": x.tobytes(),
+        "y": y.tobytes(),
+        "first_name": [p.first_name for p in persons],
+        "last_names": list(last_names),
+        "last_name": last_name_idx.tobytes(),
+        "patronymic": [getattr(p, "patronymic", None) for p in persons],
+        "avatar_thumb_url": [p.avatar_thumb_url for p in persons],
+        "birth_date": birth.tobytes(),
+        "descendant_count": descendants.tobytes(),
+        "ancestor_count": ancestors.tobytes(),
+        "edge_types": EDGE_TYPES,
+        "edge_ids": b"".join(rel.id.bytes for rel in kept),
+        "edge_source": np.fromiter(
+            (index[rel.person_id] for rel in kept), dtype="<u4", count=len(kept)
+        ).tobytes(),
+        "edge_target": np.fromiter(
+            (index[rel.related_person_id] for rel in kept), dtype="<u4", count=len(kept)
+        ).tobytes(),
+        "edge_type": np.fromiter(
+            (type_index[rel.relationship_type.value] for rel in kept), dtype="u1", count=len(kept)
+        ).tobytes(),
+        "cycle_person_ids": b"".join(pid.bytes for pid in cycles),
+    }
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,140 @@
+"""Background purge of deleted trees.
+
+Deleting a tree only stamps ``trees.deleted_at`` and records a
+``tree_purges`` row; the purger then removes the tree's persons in batches
+(relationships, media rows, sections, proposals and closure rows follow
+through ON DELETE CASCADE), deletes the batch's storage objects with bulk
+requests, and finally the tree row itself. Each batch commits on its own and
+updates the progress row, so a restart resumes where the purge stopped.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import structlog
+from sqlalchemy import delete, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, any_uuid, run_after_commit
+from app.models.media import PersonDocument, PersonPhoto
+from app.models.person import Person
+from app.models.tree import Tree
+from app.models.tree_purge import TreePurge
+from app.services.storage import remove_files
+
+logger = structlog.get_logger()
+
+PURGE_BATCH_SIZE = 500
+
+
+async def _purge_batch(tree_id: uuid.UUID) -> int:
+    """Delete up to ``PURGE_BATCH_SIZE`` persons of the tree; returns how many went.
+
+    The progress row is locked for the batch, so processes resuming the same
+    purge take turns, and progress counts the rows each DELETE removed.
+    """
+    async with AsyncSessionLocal() as db:
+        purge = await db.scalar(
+            select(TreePurge.tree_id).where(TreePurge.tree_id == tree_id).with_for_update()
+        )
+        if purge is None:
+            return 0
+        batch = (
+            await db.scalars(
+                select(Person.id).where(Person.tree_id == tree_id).limit(PURGE_BATCH_SIZE)
+            )
+        ).all()
+        if not batch:
+            return 0
+
+        ids = any_uuid(batch)
+        files = await db.scalars(
+            union_all(
+                select(PersonPhoto.file_url).where(PersonPhoto.person_id == ids),
+                select(PersonDocument.file_url).where(PersonDocument.person_id == ids),
+                select(Person.avatar_url).where(Person.id == ids, Person.avatar_url.is_not(None)),
+                select(Person.avatar_thumb_url).where(
+                    Person.id == ids, Person.avatar_thumb_url.is_not(None)
+                ),
+            )
+        )
+        file_urls = list(files)
+
+        deleted = (await db.execute(delete(Person).where(Person.id == ids))).rowcount
+        await db.execute(
+            update(TreePurge)
+            .where(TreePurge.tree_id == tree_id)
+            .values(persons_deleted=TreePurge.persons_deleted + deleted)
+        )
+        await db.commit()
+
+        # Rows are gone first so an interrupted purge never points at missing objects.
+        removed = await remove_files(file_urls)
+        await db.execute(
+            update(TreePurge)
+            .where(TreePurge.tree_id == tree_id)
+            .values(files_deleted=TreePurge.files_deleted + removed)
+        )
+        await db.commit()
+        return len(batch)
+
+
+async def purge_tree(tree_id: uuid.UUID) -> None:
+    while await _purge_batch(tree_id):
+        await asyncio.sleep(0)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Tree).where(Tree.id == tree_id))
+        await db.execute(
+            update(TreePurge)
+            .where(TreePurge.tree_id == tree_id, TreePurge.finished_at.is_(None))
+            .values(finished_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+    logger.info("Tree purged", tree_id=str(tree_id))
+
+
+class TreePurger:
+    """Runs at most one purge task per tree on the event loop."""
+
+    def __init__(self) -> None:
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+    def start(self, tree_id: uuid.UUID) -> None:
+        if tree_id in self._tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(tree_id))
+        self._tasks[tree_id] = task
+
+    def start_after_commit(self, db: AsyncSession, tree_id: uuid.UUID) -> None:
+        run_after_commit(db, lambda: self.start(tree_id))
+
+    async def _run(self, tree_id: uuid.UUID) -> None:
+        try:
+            await purge_tree(tree_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.error("Tree purge failed", tree_id=str(tree_id), exc_info=True)
+        finally:
+            self._tasks.pop(tree_id, None)
+
+    async def resume(self) -> None:
+        """Restart purges left unfinished by a previous process."""
+        async with AsyncSessionLocal() as db:
+            pending = (
+                await db.scalars(select(TreePurge.tree_id).where(TreePurge.finished_at.is_(None)))
+            ).all()
+        for tree_id in pending:
+            self.start(tree_id)
+        if pending:
+            logger.info("Resuming tree purges", count=len(pending))
+
+    async def shutdown(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+tree_purger = TreePurger()
@@ -0,0 +1,90 @@
+"""Compare the ReactFlow JSON and columnar MessagePack tree payloads.
+
+Run from the backend directory::
+
+    python -m benchmarks.encoding_bench --persons 100000
+"""
+import argparse
+import asyncio
+import gzip
+import time
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import msgpack
+import numpy as np
+
+from app.models.relationship import RelationshipType
+from app.routers.trees import _build_tree_nodes, _is_rendered_edge, _layout_positions, _pair_keys
+from app.services.tree_codec import pack_tree
+from benchmarks.synthetic import synthetic_family
+
+FIRST_NAMES = ["Ivan", "Anna", "Pyotr", "Maria", "Nikolai", "Olga", "Sergei", "Elena"]
+LAST_NAMES = ["Ivanov", "Petrov", "Sidorov", "Smirnov", "Kuznetsov", "Popov", "Vasiliev"]
+
+
+def synthetic_rows(person_count: int):
+    rng = np.random.default_rng(0)
+    src, dst, spouse_a, spouse_b = synthetic_family(person_count)
+    persons = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+            last_name=LAST_NAMES[int(rng.integers(len(LAST_NAMES)))],
+            patronymic=None,
+            avatar_thumb_url=None,
+            birth_date=date(1800, 1, 1) + timedelta(days=int(rng.integers(80_000))),
+        )
+        for i in range(person_count)
+    ]
+
+    def rel(a: int, b: int, kind: RelationshipType):
+        return SimpleNamespace(
+            id=uuid.uuid4(),
+            person_id=persons[a].id,
+            related_person_id=persons[b].id,
+            relationship_type=kind,
+        )
+
+    relationships = []
+    for a, b in zip(src.tolist(), dst.tolist()):
+        relationships += [rel(a, b, RelationshipType.parent), rel(b, a, RelationshipType.child)]
+    for a, b in zip(spouse_a.tolist(), spouse_b.tolist()):
+        relationships += [rel(a, b, RelationshipType.spouse), rel(b, a, RelationshipType.spouse)]
+    return persons, relationships
+
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--persons", type=int, default=100_000)
+    args = parser.parse_args()
+
+    persons, relationships = synthetic_rows(args.persons)
+    positions = asyncio.run(_layout_positions([p.id for p in persons], relationships))
+    present = _pair_keys(relationships)
+    edges = [r for r in relationships if _is_rendered_edge(r, present)]
+    print(f"persons={len(persons)} relationship_rows={len(relationships)} edges={len(edges)}")
+
+    as_json, json_ms = timed(
+        lambda: _build_tree_nodes(persons, relationships, positions).model_dump_json().encode()
+    )
+    packed, packed_ms = timed(lambda: pack_tree(persons, edges, positions))
+    _, unpack_ms = timed(lambda: msgpack.unpackb(packed))
+
+    for name, body, ms in (("json", as_json, json_ms), ("msgpack", packed, packed_ms)):
+        print(
+            f"{name:8} size={len(body) / 1e6:7.2f}MB gzip={len(gzip.compress(body, 6)) / 1e6:6.2f}MB "
+            f"encode={ms:7.1f}ms"
+        )
+    print(f"msgpack decode={unpack_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
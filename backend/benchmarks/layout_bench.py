@@ -0,0 +1,77 @@
+"""Benchmark the layered tree layout on synthetic trees.
+
+Run from the backend directory::
+
+    python -m benchmarks.layout_bench --persons 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.layout import layered_layout, longest_path_layers
+from benchmarks.synthetic import synthetic_family
+
+
+def count_crossings(x: np.ndarray, y: np.ndarray, src: np.ndarray, dst: np.ndarray) -> int:
+    """Edge crossings between adjacent layers (inversion count per layer pair)."""
+    total = 0
+    adjacent = y[dst] > y[src]
+    src, dst = src[adjacent], dst[adjacent]
+    for top in np.unique(y[src]):
+        in_band = y[src] == top
+        order = np.lexsort((x[dst[in_band]], x[src[in_band]]))
+        targets = np.unique(x[dst[in_band]], return_inverse=True)[1][order]
+        tree = [0] * (int(targets.max()) + 2)
+        seen = 0
+        for value in targets.tolist():
+            i = value + 1
+            not_greater = 0
+            while i > 0:
+                not_greater += tree[i]
+                i -= i & -i
+            total += seen - not_greater
+            i = value + 1
+            while i < len(tree):
+                tree[i] += 1
+                i += i & -i
+            seen += 1
+    return total
+
+
+def naive_layout(node_count: int, src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The previous placement: generation rows, persons in arbitrary order at x = idx * 200."""
+    layer = longest_path_layers(node_count, src, dst)
+    shuffled = np.random.default_rng(1).permutation(node_count)
+    order = shuffled[np.argsort(layer[shuffled], kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(np.bincount(layer))[:-1]))
+    x = np.empty(node_count)
+    x[order] = (np.arange(node_count) - starts[layer[order]]) * 200.0
+    return x, layer * 200.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--persons", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--crossings", action="store_true", help="also count edge crossings")
+    args = parser.parse_args()
+
+    src, dst, spouse_a, spouse_b = synthetic_family(args.persons)
+    node_count = args.persons
+    print(f"persons={node_count} parent_edges={src.size} spouse_pairs={spouse_a.size}")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        x, y = layered_layout(node_count, src, dst, spouse_a, spouse_b)
+        timings.append(time.perf_counter() - started)
+    print(f"layered_layout: best={min(timings) * 1000:.1f}ms median={sorted(timings)[len(timings) // 2] * 1000:.1f}ms")
+
+    if args.crossings:
+        nx, ny = naive_layout(node_count, src, dst)
+        print(f"crossings naive={count_crossings(nx, ny, src, dst)} layered={count_crossings(x, y, src, dst)}")
+
+
+if __name__ == "__main__":
+    main()
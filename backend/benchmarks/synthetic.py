@@ -0,0 +1,52 @@
+"""Synthetic family-tree generator shared by the benchmark scripts."""
+import numpy as np
+
+
+def synthetic_family(
+    person_count: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Generate a multi-root genealogy of roughly ``person_count`` persons.
+
+    Each generation pairs some of its members with newly created in-laws (extra
+    roots) and gives every couple a few children. Returns parent → child edges
+    and spouse pairs as index arrays: ``(parent_src, parent_dst, spouse_a, spouse_b)``.
+    """
+    rng = np.random.default_rng(seed)
+    founders = max(2, person_count // 200)
+    next_id = founders
+    generation = np.arange(founders)
+
+    parent_src: list[np.ndarray] = []
+    parent_dst: list[np.ndarray] = []
+    spouse_a: list[np.ndarray] = []
+    spouse_b: list[np.ndarray] = []
+
+    while next_id < person_count and generation.size:
+        married = generation[rng.random(generation.size) < 0.7]
+        in_laws = np.arange(next_id, next_id + married.size)
+        next_id += married.size
+        spouse_a.append(married)
+        spouse_b.append(in_laws)
+
+        child_counts = rng.poisson(2.3, married.size)
+        total = int(child_counts.sum())
+        if total == 0:
+            break
+        children = np.arange(next_id, next_id + total)
+        next_id += total
+        for parents in (married, in_laws):
+            parent_src.append(np.repeat(parents, child_counts))
+            parent_dst.append(children)
+        generation = children
+
+    limit = min(next_id, person_count)
+
+    def _clip(src_parts, dst_parts):
+        src = np.concatenate(src_parts) if src_parts else np.empty(0, dtype=np.int64)
+        dst = np.concatenate(dst_parts) if dst_parts else np.empty(0, dtype=np.int64)
+        keep = (src < limit) & (dst < limit)
+        return src[keep].astype(np.int64), dst[keep].astype(np.int64)
+
+    src, dst = _clip(parent_src, parent_dst)
+    a, b = _clip(spouse_a, spouse_b)
+    return src, dst, a, b
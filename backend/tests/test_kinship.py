@@ -0,0 +1,55 @@
+import pytest
+
+from app.models.relationship import RelationshipType
+from app.services.kinship import kinship_label
+
+PARENT = RelationshipType.parent
+CHILD = RelationshipType.child
+SIBLING = RelationshipType.sibling
+SPOUSE = RelationshipType.spouse
+
+
+@pytest.mark.parametrize(
+    ("steps", "label"),
+    [
+        ([], "self"),
+        ([PARENT], "parent"),
+        ([PARENT, PARENT], "grandparent"),
+        ([CHILD, CHILD, CHILD], "great-grandchild"),
+        ([PARENT, CHILD], "sibling"),
+        ([PARENT, PARENT, CHILD, CHILD], "first cousin"),
+        ([PARENT, PARENT, PARENT, CHILD, CHILD], "first cousin once removed"),
+        ([SPOUSE], "spouse"),
+        ([CHILD, PARENT], "spouse"),
+        ([PARENT, SPOUSE], "step-parent"),
+        ([SPOUSE, CHILD], "stepchild"),
+        ([SPOUSE, PARENT], "parent-in-law"),
+        ([CHILD, SPOUSE], "child-in-law"),
+    ],
+)
+def test_blood_and_marriage_paths(steps, label):
+    assert kinship_label(steps) == label
+
+
+@pytest.mark.parametrize(
+    ("steps", "label"),
+    [
+        ([SIBLING], "sibling"),
+        # A sibling's sibling used to read U-D-U-D -> U-S-D.
+        ([SIBLING, SIBLING], "sibling"),
+        # A sibling's parent used to read U-D-U -> U-S.
+        ([SIBLING, PARENT], "parent"),
+        ([CHILD, SIBLING], "child"),
+        ([PARENT, SIBLING], "aunt/uncle"),
+        ([SIBLING, CHILD], "niece/nephew"),
+        ([SIBLING, CHILD, CHILD], "grandniece/nephew"),
+        ([PARENT, SIBLING, CHILD], "first cousin"),
+        ([PARENT, PARENT, SIBLING, CHILD, CHILD], "second cousin"),
+        ([PARENT, SIBLING, SIBLING, CHILD], "first cousin"),
+        ([SIBLING, SPOUSE], "sibling-in-law"),
+        ([SPOUSE, SIBLING], "sibling-in-law"),
+        ([SIBLING, PARENT, SPOUSE], "step-parent"),
+    ],
+)
+def test_sibling_steps(steps, label):
+    assert kinship_label(steps) == label
@@ -0,0 +1,106 @@
+"""Query count of a person's relationship listing.
+
+Needs a migrated Postgres database (``alembic upgrade head``) named by
+``TEST_DATABASE_URL``; every test runs in a transaction that is rolled back.
+"""
+import os
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.person import Person
+from app.models.relationship import Relationship, RelationshipType
+from app.models.tree import Tree
+from app.models.user import User
+from app.routers.persons import _relationships_with_persons
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        async with AsyncSession(bind=conn, expire_on_commit=False) as session:
+            yield session
+        await transaction.rollback()
+    await engine.dispose()
+
+
+async def _person_with_relationships(db: AsyncSession, tree: Tree, count: int) -> Person:
+    """A person with ``count`` relatives: even ones stored both ways, odd ones incoming only."""
+    person = Person(tree_id=tree.id, first_name="Focal", last_name="Person")
+    relatives = [
+        Person(tree_id=tree.id, first_name=f"Relative {i}", last_name="Person") for i in range(count)
+    ]
+    db.add_all([person, *relatives])
+    await db.flush()
+    for i, relative in enumerate(relatives):
+        db.add(
+            Relationship(
+                tree_id=tree.id,
+                person_id=relative.id,
+                related_person_id=person.id,
+                relationship_type=RelationshipType.parent,
+            )
+        )
+        if i % 2 == 0:
+            db.add(
+                Relationship(
+                    tree_id=tree.id,
+                    person_id=person.id,
+                    related_person_id=relative.id,
+                    relationship_type=RelationshipType.child,
+                )
+            )
+    await db.flush()
+    return person
+
+
+async def _count_statements(db: AsyncSession, person: Person) -> tuple[int, int]:
+    """Statements issued and items returned when listing ``person``'s relationships."""
+    # Nothing may come from the identity map, as in a fresh request.
+    db.expunge_all()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        items = await _relationships_with_persons(db, person.id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+    assert all(item.related is not None for item in items)
+    return len(statements), len(items)
+
+
+async def test_statement_count_does_not_grow_with_relationships(db):
+    user = User(email="relationships-query-count@example.com")
+    db.add(user)
+    await db.flush()
+    tree = Tree(owner_id=user.id, name="Query count")
+    db.add(tree)
+    await db.flush()
+
+    single = await _person_with_relationships(db, tree, 1)
+    many = await _person_with_relationships(db, tree, 25)
+
+    single_statements, single_items = await _count_statements(db, single)
+    many_statements, many_items = await _count_statements(db, many)
+
+    assert (single_items, many_items) == (1, 25)
+    assert single_statements == many_statements == 1